@@ -1,7 +1,25 @@
+"""
+ASGI entry point, for serving many concurrent AI requests from one process.
+
+The visoraai and visoraplanner AI views are async: while a model call is in flight they hold
+no thread, so a single worker keeps hundreds of generations going (up to LLM_MAX_IN_FLIGHT).
+The other views are sync and run in Django's thread pool, as under WSGI. Run it with any
+ASGI server, one event loop per worker process, e.g.:
+
+    uvicorn dataserver.asgi:application --workers 4
+
+dataserver.wsgi keeps working; there each AI request still occupies a worker thread.
+"""
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "dataserver.settings")
+# The server's event loop lives as long as the process, so the AI views can await the SDK's
+# async client (see visoraai.llm.generate_content_async).
+os.environ.setdefault("DJANGO_LLM_ASYNC_CLIENT", "True")
+# Under ASGI every request gets DB connections of its own, so persistent connections are never
+# reused; Django recommends turning them off (the Postgres profile pools connections instead).
+os.environ.setdefault("DJANGO_DB_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
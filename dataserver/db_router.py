@@ -0,0 +1,32 @@
+"""
+Routes reads to the "replica" alias and everything else to "default" (see DB_READ_REPLICA).
+
+Both aliases open the same SQLite file, the replica with query_only set. Under WAL a reader
+sees the last committed state without waiting on the writer, so feeds and leaderboards do not
+queue behind session and like writes. Reads inside a transaction on "default" stay there, so
+they see that transaction's own uncommitted writes.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = "replica"
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is the same file; the schema is only ever migrated through "default".
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
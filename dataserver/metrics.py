@@ -0,0 +1,296 @@
+"""
+Per-route request metrics in the Prometheus text format.
+
+RequestMetricsMiddleware records, for each resolved URL name and method, a latency
+histogram, the number and total time of DB queries, response bytes and status codes.
+Every thread aggregates into its own shard, so recording takes no lock; a scrape sums the
+shards. When a thread exits, its shard is folded into a retired total, so thread-per-request
+servers do not pile up shards. With METRICS_MULTIPROC_DIR set, each process also dumps its totals there (at most
+every METRICS_FLUSH_SECONDS, written atomically), and a scrape served by any worker merges
+the files of every process. Point it at a directory that is emptied when the server starts.
+The middleware works under WSGI and ASGI; async requests all record into the event loop
+thread's shard.
+"""
+import contextvars
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED_ROUTE = "<unmatched>"
+# Django accepts any method token; others are recorded as OTHER_METHOD so clients cannot mint series.
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+OTHER_METHOD = "other"
+
+# Shard id -> {key: RouteStats} of each live thread; _retired holds the totals of exited threads.
+_shards = {}
+_retired = {}
+# Reentrant: a finalizer may retire a shard on a thread that is in the middle of collect_local().
+_shards_lock = threading.RLock()
+_shard_ids = itertools.count()
+_local = threading.local()
+_last_dump = 0.0
+# The QueryTimer of the request being served. A context variable rather than a wrapper installed
+# per request: under ASGI, sync views run in another thread with connections of their own, but
+# they inherit the context.
+_current_timer = contextvars.ContextVar("visora_query_timer", default=None)
+
+
+class RouteStats:
+    __slots__ = ("buckets", "requests", "seconds", "queries", "query_seconds", "response_bytes", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.requests = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def merge(self, other):
+        """Adds another RouteStats, or its to_dict() form, into this one."""
+        if isinstance(other, RouteStats):
+            other = other.to_dict()
+        self.buckets = [a + b for a, b in zip(self.buckets, other["buckets"])]
+        self.requests += other["requests"]
+        self.seconds += other["seconds"]
+        self.queries += other["queries"]
+        self.query_seconds += other["query_seconds"]
+        self.response_bytes += other["response_bytes"]
+        for code, count in other["statuses"].items():
+            self.statuses[str(code)] = self.statuses.get(str(code), 0) + count
+
+
+class _ShardOwner:
+    """Lives in the thread's local storage, so it is freed when the thread exits."""
+
+
+def _thread_shard():
+    shard = getattr(_local, "routes", None)
+    if shard is None:
+        shard = _local.routes = {}
+        shard_id = next(_shard_ids)
+        with _shards_lock:
+            _shards[shard_id] = shard
+        _local.owner = _ShardOwner()
+        weakref.finalize(_local.owner, _retire_shard, shard_id)
+    return shard
+
+
+def _retire_shard(shard_id):
+    # Runs once the owning thread has exited, so nothing writes to the shard any more.
+    with _shards_lock:
+        shard = _shards.pop(shard_id, {})
+        for key, stats in shard.items():
+            _retired.setdefault(key, RouteStats()).merge(stats)
+
+
+class QueryTimer:
+    """A connection.execute_wrapper that counts queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def _timed_execute(execute, sql, params, many, context):
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def _install_query_timer(sender, connection, **kwargs):
+    # Sent on every (re)connect of the same wrapper; install the execute wrapper only once.
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+connection_created.connect(_install_query_timer, dispatch_uid="visora_metrics_query_timer")
+
+
+def _response_size(response):
+    if response.streaming:
+        return int(response.get("Content-Length") or 0)
+    return len(response.content)
+
+
+def record(route, method, status_code, seconds, queries, query_seconds, response_bytes):
+    key = f"{route}\x00{method}"
+    stats = _thread_shard().get(key)
+    if stats is None:
+        stats = _thread_shard()[key] = RouteStats()
+    for index, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            stats.buckets[index] += 1
+            break
+    stats.requests += 1
+    stats.seconds += seconds
+    stats.queries += queries
+    stats.query_seconds += query_seconds
+    stats.response_bytes += response_bytes
+    code = str(status_code)
+    stats.statuses[code] = stats.statuses.get(code, 0) + 1
+
+
+def collect_local():
+    """Sums this process's thread shards and retired totals into {key: RouteStats}."""
+    totals = {}
+    with _shards_lock:
+        for shard in [_retired, *_shards.values()]:
+            for key, stats in list(shard.items()):
+                totals.setdefault(key, RouteStats()).merge(stats)
+    return totals
+
+
+def dump_process_metrics(directory):
+    """Writes this process's totals to <directory>/<pid>.json, atomically."""
+    payload = {key: stats.to_dict() for key, stats in collect_local().items()}
+    handle, temp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+    with os.fdopen(handle, "w") as temp_file:
+        json.dump(payload, temp_file)
+    os.replace(temp_path, os.path.join(directory, f"{os.getpid()}.json"))
+
+
+def _maybe_dump():
+    global _last_dump
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory or time.monotonic() - _last_dump < settings.METRICS_FLUSH_SECONDS:
+        return
+    _last_dump = time.monotonic()
+    dump_process_metrics(directory)
+
+
+def collect():
+    """Totals across every process when METRICS_MULTIPROC_DIR is set, else for this process."""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return collect_local()
+    dump_process_metrics(directory)
+    totals = {}
+    for file_name in os.listdir(directory):
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, file_name)) as metrics_file:
+                payload = json.load(metrics_file)
+        except (OSError, ValueError):
+            continue
+        for key, stats in payload.items():
+            totals.setdefault(key, RouteStats()).merge(stats)
+    return totals
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+def render_prometheus(totals):
+    lines = [
+        "# HELP visora_request_duration_seconds Request latency by route.",
+        "# TYPE visora_request_duration_seconds histogram",
+    ]
+    rows = sorted((key.split("\x00", 1), stats) for key, stats in totals.items())
+    for (route, method), stats in rows:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+            cumulative += count
+            lines.append(f"visora_request_duration_seconds_bucket{_labels(route=route, method=method, le=bound)} {cumulative}")
+        lines.append(f"visora_request_duration_seconds_bucket{_labels(route=route, method=method, le='+Inf')} {stats.requests}")
+        lines.append(f"visora_request_duration_seconds_sum{_labels(route=route, method=method)} {stats.seconds}")
+        lines.append(f"visora_request_duration_seconds_count{_labels(route=route, method=method)} {stats.requests}")
+
+    counters = [
+        ("visora_db_queries_total", "DB queries run while serving the route.", "queries"),
+        ("visora_db_query_seconds_total", "Time spent in DB queries while serving the route.", "query_seconds"),
+        ("visora_response_bytes_total", "Response body bytes sent by the route.", "response_bytes"),
+    ]
+    for name, help_text, field in counters:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (route, method), stats in rows:
+            lines.append(f"{name}{_labels(route=route, method=method)} {getattr(stats, field)}")
+
+    lines += ["# HELP visora_responses_total Responses by route and status code.", "# TYPE visora_responses_total counter"]
+    for (route, method), stats in rows:
+        for code, count in sorted(stats.statuses.items()):
+            lines.append(f"visora_responses_total{_labels(route=route, method=method, status=code)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    return HttpResponse(render_prometheus(collect()), content_type=CONTENT_TYPE)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        # Connections opened before this module was imported never sent connection_created.
+        for connection in connections.all(initialized_only=True):
+            _install_query_timer(None, connection)
+        timer = QueryTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        self.record(request, response, time.perf_counter() - start, timer)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        timer = QueryTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        self.record(request, response, time.perf_counter() - start, timer)
+        return response
+
+    def record(self, request, response, elapsed, timer):
+        match = getattr(request, "resolver_match", None)
+        route = (match.view_name if match else None) or UNMATCHED_ROUTE
+        method = request.method if request.method in KNOWN_METHODS else OTHER_METHOD
+        record(route, method, response.status_code, elapsed, timer.count, timer.seconds, _response_size(response))
+        _maybe_dump()
@@ -1,5 +1,7 @@
 from pathlib import Path
 import os
+
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -52,6 +54,7 @@ INSTALLED_APPS = [
 
 # Middleware
 MIDDLEWARE = [
+    'dataserver.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
 
     "django.middleware.security.SecurityMiddleware",
@@ -59,6 +62,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "staticdata.identity.VisoraUserMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -84,13 +88,85 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "dataserver.wsgi.application"
 
-# Database
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Database: DB_ENGINE is "sqlite" (db.sqlite3, the default) or "postgres" (the DJANGO_POSTGRES_*
+# settings below). `manage.py copy_from_sqlite` moves an existing db.sqlite3 into Postgres.
+DB_ENGINE = os.getenv('DJANGO_DB_ENGINE', 'sqlite')
+# Connections are kept for DB_CONN_MAX_AGE seconds (0 closes them after every request).
+DB_CONN_MAX_AGE = int(os.getenv('DJANGO_DB_CONN_MAX_AGE', '600'))
+
+# The SQLite file is in WAL mode (set once by migration staticdata 0032, as the mode is stored in the
+# file), so readers never wait on a writer. Every connection waits up to DB_BUSY_TIMEOUT_MS for the
+# write lock instead of failing with "database is locked".
+# Transactions start with BEGIN IMMEDIATE: they take the write lock up front, where the busy
+# timeout applies, rather than failing when a read lock is later upgraded.
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DJANGO_DB_BUSY_TIMEOUT_MS', '5000'))
+DB_MMAP_SIZE = int(os.getenv('DJANGO_DB_MMAP_SIZE', str(256 * 1024 * 1024)))
+# With DB_READ_REPLICA, dataserver.db_router sends reads outside a transaction to the "replica"
+# alias: query-only connections to the same file, which under WAL read the last committed state
+# without queueing behind writers. SQLite only; Postgres readers never wait on writers.
+DB_READ_REPLICA = os.getenv('DJANGO_DB_READ_REPLICA', 'True') == 'True'
+
+# Postgres connections come from a psycopg pool of POSTGRES_POOL_MIN_SIZE..POSTGRES_POOL_MAX_SIZE
+# per process; a request waits up to POSTGRES_POOL_TIMEOUT seconds for one. With the pool off,
+# DB_CONN_MAX_AGE applies instead (use that behind an external pooler such as PgBouncer).
+POSTGRES_POOL = os.getenv('DJANGO_POSTGRES_POOL', 'True') == 'True'
+POSTGRES_POOL_MIN_SIZE = int(os.getenv('DJANGO_POSTGRES_POOL_MIN_SIZE', '2'))
+POSTGRES_POOL_MAX_SIZE = int(os.getenv('DJANGO_POSTGRES_POOL_MAX_SIZE', '10'))
+POSTGRES_POOL_TIMEOUT = float(os.getenv('DJANGO_POSTGRES_POOL_TIMEOUT', '10'))
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv('DJANGO_POSTGRES_DB', 'visora'),
+            "USER": os.getenv('DJANGO_POSTGRES_USER', 'visora'),
+            "PASSWORD": os.getenv('DJANGO_POSTGRES_PASSWORD', ''),
+            "HOST": os.getenv('DJANGO_POSTGRES_HOST', 'localhost'),
+            "PORT": os.getenv('DJANGO_POSTGRES_PORT', '5432'),
+            # Pooled connections go back to the pool after every request.
+            "CONN_MAX_AGE": 0 if POSTGRES_POOL else DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "pool": {
+                    "min_size": POSTGRES_POOL_MIN_SIZE,
+                    "max_size": POSTGRES_POOL_MAX_SIZE,
+                    "timeout": POSTGRES_POOL_TIMEOUT,
+                },
+            } if POSTGRES_POOL else {},
+        }
     }
-}
+elif DB_ENGINE == 'sqlite':
+    SQLITE_PRAGMAS = [
+        f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={DB_MMAP_SIZE}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "init_command": "; ".join(["PRAGMA synchronous=NORMAL", *SQLITE_PRAGMAS]),
+                "transaction_mode": "IMMEDIATE",
+            },
+        }
+    }
+    if DB_READ_REPLICA:
+        DATABASES["replica"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {
+                "init_command": "; ".join(["PRAGMA query_only=ON", *SQLITE_PRAGMAS]),
+            },
+            "TEST": {"MIRROR": "default"},
+        }
+        DATABASE_ROUTERS = ["dataserver.db_router.ReadReplicaRouter"]
+else:
+    raise ImproperlyConfigured(f"DJANGO_DB_ENGINE must be 'sqlite' or 'postgres', not {DB_ENGINE!r}.")
 
 # REST Framework
 REST_FRAMEWORK = {
@@ -122,6 +198,68 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Project previews: "x-accel-redirect" (nginx) or "x-sendfile" (Apache/lighttpd) lets the
+# front proxy send combined.html itself. The accel prefix must map to MEDIA_ROOT as an
+# internal location in the proxy config.
+PROJECT_PREVIEW_SENDFILE = os.getenv('DJANGO_PREVIEW_SENDFILE', '').lower()
+PROJECT_PREVIEW_ACCEL_PREFIX = os.getenv('DJANGO_PREVIEW_ACCEL_PREFIX', '/protected-media/')
+# Previews are user-uploaded HTML/JS served from the API's own origin. The CSP sandbox gives them an
+# opaque origin, so their scripts cannot read this origin's cookies or call it as the viewer.
+PROJECT_PREVIEW_CSP = os.getenv('DJANGO_PREVIEW_CSP', 'sandbox allow-scripts')
+
+# Bulk project import (staticdata.bulk_import)
+BULK_IMPORT_MAX_PROJECTS = int(os.getenv('DJANGO_BULK_IMPORT_MAX_PROJECTS', '500'))
+BULK_IMPORT_MAX_BYTES = int(os.getenv('DJANGO_BULK_IMPORT_MAX_BYTES', str(50 * 1024 * 1024)))
+BULK_IMPORT_WORKERS = int(os.getenv('DJANGO_BULK_IMPORT_WORKERS', '4'))
+
+# Upload job queue (staticdata.jobs). With ASYNC_UPLOADS on, uploads answer 202 and are published
+# by `manage.py process_upload_jobs`; clients can also opt in per request with `Prefer: respond-async`.
+ASYNC_UPLOADS = os.getenv('DJANGO_ASYNC_UPLOADS', 'False') == 'True'
+UPLOAD_JOB_MAX_ATTEMPTS = int(os.getenv('DJANGO_UPLOAD_JOB_MAX_ATTEMPTS', '5'))
+UPLOAD_JOB_LEASE_SECONDS = int(os.getenv('DJANGO_UPLOAD_JOB_LEASE_SECONDS', '300'))
+UPLOAD_JOB_RETRY_BASE_SECONDS = int(os.getenv('DJANGO_UPLOAD_JOB_RETRY_BASE_SECONDS', '10'))
+UPLOAD_JOB_RETRY_MAX_SECONDS = int(os.getenv('DJANGO_UPLOAD_JOB_RETRY_MAX_SECONDS', '3600'))
+
+# Leaderboard: flush_dirty_scores recomputes an owner at most once per interval, however many
+# likes/comments arrive in between (event deltas keep the score current meanwhile).
+SCORE_FLUSH_INTERVAL_SECONDS = int(os.getenv('DJANGO_SCORE_FLUSH_INTERVAL_SECONDS', '5'))
+
+# Write-behind like counters (staticdata.like_buffer). When on, `manage.py flush_like_deltas` must
+# be running; like counts and scores then lag by at most LIKE_FLUSH_INTERVAL_SECONDS.
+LIKE_WRITE_BEHIND = os.getenv('DJANGO_LIKE_WRITE_BEHIND', 'False') == 'True'
+LIKE_FLUSH_INTERVAL_SECONDS = float(os.getenv('DJANGO_LIKE_FLUSH_INTERVAL_SECONDS', '2'))
+
+# Caller identity (staticdata.identity). Known Authorization usernames are cached for TTL seconds
+# (0 disables caching): per process by default, or in the CACHES alias named here so that every
+# worker shares entries and sees invalidations (e.g. a Redis or Memcached cache).
+VISORA_USER_CACHE_TTL = int(os.getenv('DJANGO_VISORA_USER_CACHE_TTL', '60'))
+VISORA_USER_CACHE_SIZE = int(os.getenv('DJANGO_VISORA_USER_CACHE_SIZE', '10000'))
+VISORA_USER_CACHE_ALIAS = os.getenv('DJANGO_VISORA_USER_CACHE_ALIAS', '')
+
+# Request metrics (dataserver.metrics), scraped at /<DJANGO_ADMIN_SECRET_PATH>/metrics. Under a
+# multi-process server set METRICS_MULTIPROC_DIR to a directory shared by the workers and cleared
+# on startup; a scrape then reports every worker, each at most METRICS_FLUSH_SECONDS behind.
+METRICS_ENABLED = os.getenv('DJANGO_METRICS_ENABLED', 'True') == 'True'
+METRICS_MULTIPROC_DIR = os.getenv('DJANGO_METRICS_MULTIPROC_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.getenv('DJANGO_METRICS_FLUSH_SECONDS', '5'))
+
+# LLM backend of the AI views (visoraai.llm): "gemini", or "fake" for a local stand-in used in
+# load tests. The fake waits LLM_FAKE_LATENCY ms before its first chunk (fixed:<ms>,
+# uniform:<min>,<max> or lognormal:<median>,<sigma>), then LLM_FAKE_CHUNK_INTERVAL_MS per chunk of
+# LLM_FAKE_CHUNK_CHARS characters; the rates are fractions of calls that fail or come back blocked.
+LLM_BACKEND = os.getenv('DJANGO_LLM_BACKEND', 'gemini')
+LLM_FAKE_LATENCY = os.getenv('DJANGO_LLM_FAKE_LATENCY', 'lognormal:800,0.5')
+LLM_FAKE_CHUNK_INTERVAL_MS = float(os.getenv('DJANGO_LLM_FAKE_CHUNK_INTERVAL_MS', '30'))
+LLM_FAKE_CHUNK_CHARS = int(os.getenv('DJANGO_LLM_FAKE_CHUNK_CHARS', '100'))
+LLM_FAKE_FAILURE_RATE = float(os.getenv('DJANGO_LLM_FAKE_FAILURE_RATE', '0'))
+LLM_FAKE_BLOCK_RATE = float(os.getenv('DJANGO_LLM_FAKE_BLOCK_RATE', '0'))
+LLM_FAKE_SEED = int(os.getenv('DJANGO_LLM_FAKE_SEED')) if os.getenv('DJANGO_LLM_FAKE_SEED') else None
+# At most LLM_MAX_IN_FLIGHT model calls run at once per process; further calls queue. With
+# LLM_ASYNC_CLIENT they await the SDK's async client, else they run on a pool of that many threads.
+# dataserver.asgi turns LLM_ASYNC_CLIENT on; it needs the long-lived event loop of an ASGI server.
+LLM_MAX_IN_FLIGHT = int(os.getenv('DJANGO_LLM_MAX_IN_FLIGHT', '256'))
+LLM_ASYNC_CLIENT = os.getenv('DJANGO_LLM_ASYNC_CLIENT', 'False') == 'True'
+
 # Internationalization
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
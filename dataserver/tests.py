@@ -0,0 +1,125 @@
+import gc
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from dataserver import metrics
+from dataserver.metrics import CONTENT_TYPE, RouteStats, collect, collect_local, render_prometheus
+
+
+def route_stats(requests, status="200"):
+    """RouteStats of `requests` requests that all fell in the first latency bucket."""
+    stats = RouteStats()
+    stats.buckets[0] = requests
+    stats.requests = requests
+    stats.seconds = 0.001 * requests
+    stats.queries = 2 * requests
+    stats.query_seconds = 0.0005 * requests
+    stats.response_bytes = 100 * requests
+    stats.statuses = {status: requests}
+    return stats
+
+
+def local_stats(route, method):
+    return collect_local().get(f"{route}\x00{method}", RouteStats())
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_MULTIPROC_DIR="")
+class RequestMetricsTests(TestCase):
+    def test_request_is_recorded_under_its_url_name(self):
+        before = local_stats("staticdata:category_list", "GET").to_dict()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("staticdata:category_list"))
+        after = local_stats("staticdata:category_list", "GET")
+
+        self.assertEqual(after.requests, before["requests"] + 1)
+        self.assertEqual(after.queries, before["queries"] + len(queries))
+        self.assertGreater(len(queries), 0)
+        self.assertEqual(after.response_bytes, before["response_bytes"] + len(response.content))
+        self.assertEqual(after.statuses["200"], before["statuses"].get("200", 0) + 1)
+
+    def test_unknown_methods_share_one_label(self):
+        before = local_stats("staticdata:category_list", "other").requests
+        self.client.generic("BREW", reverse("staticdata:category_list"))
+        self.client.generic("MADEUP", reverse("staticdata:category_list"))
+        self.assertEqual(local_stats("staticdata:category_list", "other").requests, before + 2)
+        self.assertNotIn("staticdata:category_list\x00BREW", collect_local())
+
+    def test_metrics_endpoint_serves_the_text_format(self):
+        self.client.get(reverse("staticdata:category_list"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response["Content-Type"], CONTENT_TYPE)
+        body = response.content.decode()
+        self.assertIn("# TYPE visora_request_duration_seconds histogram\n", body)
+        self.assertIn('visora_responses_total{route="staticdata:category_list",method="GET",status="200"}', body)
+
+    def test_exited_threads_are_folded_into_the_retired_total(self):
+        before = local_stats("thread-route", "GET").requests
+        threads = [
+            threading.Thread(target=metrics.record, args=("thread-route", "GET", 200, 0.01, 1, 0.001, 10))
+            for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        gc.collect()
+        self.assertEqual(local_stats("thread-route", "GET").requests, before + 20)
+        self.assertFalse(any("thread-route\x00GET" in shard for shard in metrics._shards.values()))
+
+
+class PrometheusRenderTests(SimpleTestCase):
+    def test_histogram_counters_and_label_escaping(self):
+        lines = render_prometheus({'a"b\\c\nd\x00GET': route_stats(3, status="404")}).splitlines()
+        labels = 'route="a\\"b\\\\c\\nd",method="GET"'
+        self.assertEqual(lines[:2], [
+            "# HELP visora_request_duration_seconds Request latency by route.",
+            "# TYPE visora_request_duration_seconds histogram",
+        ])
+        self.assertIn(f'visora_request_duration_seconds_bucket{{{labels},le="0.005"}} 3', lines)
+        self.assertIn(f'visora_request_duration_seconds_bucket{{{labels},le="10.0"}} 3', lines)
+        self.assertIn(f'visora_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3', lines)
+        self.assertIn(f"visora_request_duration_seconds_count{{{labels}}} 3", lines)
+        self.assertIn(f"visora_db_queries_total{{{labels}}} 6", lines)
+        self.assertIn(f"visora_response_bytes_total{{{labels}}} 300", lines)
+        self.assertIn(f'visora_responses_total{{{labels},status="404"}} 3', lines)
+        self.assertIn("# TYPE visora_db_queries_total counter", lines)
+
+
+class MultiprocessMergeTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write_process_file(self, name, payload):
+        with open(os.path.join(self.directory, name), "w") as metrics_file:
+            metrics_file.write(payload if isinstance(payload, str) else json.dumps(payload))
+
+    def test_collect_merges_every_process_file(self):
+        self.write_process_file("101.json", {"merged\x00GET": route_stats(2).to_dict()})
+        self.write_process_file("102.json", {
+            "merged\x00GET": route_stats(3, status="500").to_dict(),
+            "other-route\x00POST": route_stats(1).to_dict(),
+        })
+        # A file caught mid-write by another process is skipped, not fatal.
+        self.write_process_file("103.json", '{"merged\\u0000GET": {"requests"')
+
+        with override_settings(METRICS_MULTIPROC_DIR=self.directory):
+            totals = collect()
+
+        merged = totals["merged\x00GET"]
+        self.assertEqual(merged.requests, 5)
+        self.assertEqual(merged.buckets[0], 5)
+        self.assertEqual(merged.queries, 10)
+        self.assertEqual(merged.response_bytes, 500)
+        self.assertEqual(merged.statuses, {"200": 2, "500": 3})
+        self.assertEqual(totals["other-route\x00POST"].requests, 1)
+        # The scraping process dumps its own totals first.
+        self.assertTrue(os.path.exists(os.path.join(self.directory, f"{os.getpid()}.json")))
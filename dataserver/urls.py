@@ -4,10 +4,12 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.http import Http404
 from landing import views as landing_views
+from dataserver.metrics import metrics_view
 
 urlpatterns = [
     # Dynamic admin path
     path(f'{settings.ADMIN_URL_PREFIX}admin/', admin.site.urls),
+    path(f'{settings.ADMIN_URL_PREFIX}metrics', metrics_view, name='metrics'),
 
     # App routes
     path('', include('landing.urls')),
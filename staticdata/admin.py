@@ -9,7 +9,8 @@ import json
 # Import your models (as provided in your models.py)
 from .models import (
     ProjectFile, Project, ProjectLike, ProjectComment, UserNameDb,
-    Quiz, Leaderboard, Examples, Theory, Category, UserSessionData
+    Quiz, Leaderboard, Examples, Theory, Category, UserSessionData, UploadJob,
+    LeaderboardSnapshot
 )
 
 # IMPORTANT: Determine your app's label.
@@ -77,14 +78,16 @@ class ProjectAdmin(admin.ModelAdmin):
     list_display = ('name', 'username', 'email', 'tabname', 'gradename', 'subjectname', 'display_total_likes', 'display_total_comments', 'created_implicitly')
     search_fields = ('name', 'description', 'username__username', 'username__email', 'token', 'tabname', 'gradename', 'subjectname', 'id') # Corrected username search
     list_filter = ('tabname', 'gradename', 'subjectname', 'username') # Added username to filter
-    readonly_fields = ('id', 'display_total_likes', 'display_total_comments', 'get_folder_name_display')
+    list_select_related = ('username',)
+    autocomplete_fields = ('username',)
+    readonly_fields = ('id', 'display_total_likes', 'display_total_comments', 'get_folder_name_display', 'content_hash', 'artifact_stats')
     ordering = ('name',)
     fieldsets = (
         ('Project Information', {
-            'fields': ('name', 'description', 'id', 'get_folder_name_display')
+            'fields': ('name', 'description', 'id', 'get_folder_name_display', 'content_hash', 'artifact_stats')
         }),
         ('User & Ownership', {
-            'fields': ('username', 'email', 'token') # Assuming these are CharFields on Project now
+            'fields': ('username', 'email', 'token')
         }),
         ('Categorization', {
             'fields': ('tabname', 'gradename', 'subjectname')
@@ -117,8 +120,7 @@ class ProjectAdmin(admin.ModelAdmin):
 
     def created_implicitly(self, obj):
         is_default_token = obj.token == 'abcd'
-        # Assuming username and email on Project model are CharFields as per your models.py
-        is_default_user = obj.username == 'visora'
+        is_default_user = obj.username is None or obj.username.username == 'visora'
         is_default_email = obj.email == 'visora@gmail.com'
         return not (is_default_token and is_default_user and is_default_email)
     created_implicitly.boolean = True
@@ -248,11 +250,11 @@ class ExamplesAdmin(BaseProjectDataAdmin):
 
 @admin.register(Leaderboard)
 class LeaderboardAdmin(admin.ModelAdmin):
-    list_display = ('user_link', 'score', 'updated_at', 'needs_update_check_display')
+    list_display = ('user_link', 'score', 'updated_at', 'recompute_pending_display')
     search_fields = ('user__username', 'user__email')
     list_filter = ('updated_at',)
     readonly_fields = ('updated_at',)
-    list_select_related = ('user',)
+    list_select_related = ('user', 'user__dirty_score')
     autocomplete_fields = ('user',)
     ordering = ('-score', 'updated_at')
     date_hierarchy = 'updated_at'
@@ -264,10 +266,31 @@ class LeaderboardAdmin(admin.ModelAdmin):
         return "No User"
     user_link.short_description = "User"
 
-    def needs_update_check_display(self, obj):
-        return obj.check_time_gap()
-    needs_update_check_display.boolean = True
-    needs_update_check_display.short_description = "Update > 5s ago?"
+    def recompute_pending_display(self, obj):
+        dirty_score = getattr(obj.user, 'dirty_score', None)
+        return bool(dirty_score and dirty_score.version > dirty_score.flushed_version)
+    recompute_pending_display.boolean = True
+    recompute_pending_display.short_description = "Recompute pending?"
+
+@admin.register(LeaderboardSnapshot)
+class LeaderboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('window', 'rank', 'user', 'score', 'computed_at')
+    list_filter = ('window',)
+    search_fields = ('user__username',)
+    list_select_related = ('user',)
+    ordering = ('window', 'rank')
+    readonly_fields = ('window', 'user', 'score', 'rank', 'computed_at')
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'project', 'status', 'progress', 'attempts', 'available_at', 'locked_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('id', 'project__name', 'locked_by')
+    readonly_fields = ('id', 'created_at', 'updated_at', 'finished_at')
+    list_select_related = ('project',)
+    autocomplete_fields = ('project',)
+    ordering = ('-created_at',)
+    exclude = ('payload',)
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
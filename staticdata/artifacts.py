@@ -0,0 +1,244 @@
+import gzip
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.utils.timezone import now
+
+from staticdata.models import Project, ProjectFile
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are skipped, gzip is always produced.
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_DIR = "artifacts"
+COMBINED_FILE_NAME = "combined.html"
+# Serving variant of a blob: the minified document previews send instead of the original.
+MINIFIED_FILE_NAME = "combined.min.html"
+
+# Content-Encoding -> file suffix of the precompressed variant stored next to the served file.
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+HTML_VERBATIM_BLOCK_RE = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+HTML_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+# A tag with its attributes; quoted attribute values may contain ">".
+HTML_TAG_RE = re.compile(r"""(<(?:"[^"]*"|'[^']*'|[^'">])*>)""")
+HTML_STYLE_BLOCK_RE = re.compile(r"(<style\b[^>]*>)(.*?)(</style\s*>)", re.IGNORECASE | re.DOTALL)
+CSS_TOKEN_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)""", re.DOTALL)
+CSS_PUNCTUATION_SPACE_RE = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_html(html_content):
+    """
+    Drops comments and collapses whitespace runs in the text between tags to one space, which
+    renders the same. Tags, attribute values included, and <pre>, <textarea> and <script>
+    blocks are kept verbatim; the CSS of <style> blocks goes through minify_css.
+    """
+    parts = HTML_VERBATIM_BLOCK_RE.split(html_content)
+    minified = []
+    # split() yields [text, block, tag name, text, block, tag name, ...]
+    for index in range(0, len(parts), 3):
+        markup = HTML_TAG_RE.split(HTML_COMMENT_RE.sub("", parts[index]))
+        # ... and this one [text, tag, text, tag, ..., text].
+        markup[::2] = [re.sub(r"\s+", " ", text) for text in markup[::2]]
+        minified.append("".join(markup))
+        if index + 1 < len(parts):
+            block = parts[index + 1]
+            if parts[index + 2].lower() == "style":
+                block = HTML_STYLE_BLOCK_RE.sub(lambda m: m.group(1) + minify_css(m.group(2)) + m.group(3), block)
+            minified.append(block)
+    return "".join(minified).strip()
+
+
+def minify_css(css_content):
+    """Removes comments and whitespace around punctuation; string literals are left alone."""
+    minified = []
+    code = []
+    position = 0
+    for match in CSS_TOKEN_RE.finditer(css_content):
+        code.append(css_content[position:match.start()])
+        position = match.end()
+        if match.group(1):
+            minified.append(_minify_css_code("".join(code)))
+            minified.append(match.group(1))
+            code = []
+        else:
+            # A comment separates tokens like whitespace does.
+            code.append(" ")
+    code.append(css_content[position:])
+    minified.append(_minify_css_code("".join(code)))
+    return "".join(minified).strip()
+
+
+def _minify_css_code(code):
+    code = re.sub(r"\s+", " ", code)
+    code = CSS_PUNCTUATION_SPACE_RE.sub(r"\1", code)
+    return re.sub(r":\s+", ":", code).replace(";}", "}")
+
+
+def minify_combined_html(combined_html):
+    """
+    The serving variant of a combined.html. Its JS is kept as uploaded: even dropping blank
+    lines changes multi-line template literals, so anything more needs a real JS parser.
+    """
+    return minify_html(combined_html)
+
+
+def build_combined_html(title, html_content, css_content, js_content):
+    return f"""<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0"><title>{title}</title><style>{css_content}</style></head><body>{html_content}<script type="module">{js_content}</script></body></html>"""
+
+
+def get_artifact_relative_path(content_hash):
+    return os.path.join(ARTIFACTS_DIR, content_hash[:2], content_hash, COMBINED_FILE_NAME)
+
+
+def get_artifact_full_path(content_hash):
+    return os.path.join(settings.MEDIA_ROOT, get_artifact_relative_path(content_hash))
+
+
+def get_minified_relative_path(content_hash):
+    return os.path.join(ARTIFACTS_DIR, content_hash[:2], content_hash, MINIFIED_FILE_NAME)
+
+
+def get_legacy_relative_path(project):
+    return os.path.join("projects", project.get_folder_name(), COMBINED_FILE_NAME)
+
+
+def get_combined_html_relative_path(project):
+    """Path under MEDIA_ROOT of the blob the project currently points at."""
+    if project.content_hash:
+        return get_artifact_relative_path(project.content_hash)
+    return get_legacy_relative_path(project)
+
+
+def get_served_relative_path(project):
+    """
+    Path under MEDIA_ROOT of the file previews send: the blob's minified variant. Blobs
+    published before variants existed, and legacy folders, are sent as they are.
+    """
+    if project.content_hash:
+        minified_path = get_minified_relative_path(project.content_hash)
+        if os.path.exists(os.path.join(settings.MEDIA_ROOT, minified_path)):
+            return minified_path
+    return get_combined_html_relative_path(project)
+
+
+def write_file_atomically(full_path, data):
+    folder = os.path.dirname(full_path)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, full_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def publish_artifact(content):
+    """
+    Stores content in the blob store and returns its sha256. The blob keeps content as given,
+    so it can be edited again; next to it go the minified serving variant and that variant's
+    gzip/brotli compressions. Blobs are immutable: an existing blob is never rewritten, and new
+    files are written to a temp file in the target folder and renamed into place, so readers
+    never see a partial file. The variants are published first, so they exist whenever the
+    blob does.
+    """
+    data = content.encode("utf-8")
+    content_hash = hashlib.sha256(data).hexdigest()
+    full_path = get_artifact_full_path(content_hash)
+    if os.path.exists(full_path):
+        # Restarts prune_artifacts' grace period: the caller is about to point a project here.
+        try:
+            os.utime(os.path.dirname(full_path))
+        except FileNotFoundError:
+            pass
+        else:
+            return content_hash
+
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    minified = minify_combined_html(content).encode("utf-8")
+    minified_path = os.path.join(settings.MEDIA_ROOT, get_minified_relative_path(content_hash))
+    write_file_atomically(minified_path + ENCODING_SUFFIXES["gzip"], gzip.compress(minified, compresslevel=9, mtime=0))
+    if brotli is not None:
+        write_file_atomically(minified_path + ENCODING_SUFFIXES["br"], brotli.compress(minified, mode=brotli.MODE_TEXT))
+    write_file_atomically(minified_path, minified)
+    write_file_atomically(full_path, data)
+    logger.info(f"Published artifact {content_hash} ({len(data)} bytes, {len(minified)} minified).")
+    return content_hash
+
+
+def get_compressed_variant_path(full_path, encoding):
+    """Full path of the precompressed variant of a served file for a Content-Encoding, or None if it was not produced."""
+    variant_path = full_path + ENCODING_SUFFIXES[encoding]
+    return variant_path if os.path.exists(variant_path) else None
+
+
+def build_artifact_stats(content_hash):
+    """Value for Project.artifact_stats of a published blob: sizes in bytes of the blob and what previews send."""
+    full_path = get_artifact_full_path(content_hash)
+    served_path = os.path.join(settings.MEDIA_ROOT, get_minified_relative_path(content_hash))
+    if not os.path.exists(served_path):
+        served_path = full_path
+    stats = {"raw": os.path.getsize(full_path), "minified": os.path.getsize(served_path)}
+    for encoding in ENCODING_SUFFIXES:
+        variant_path = get_compressed_variant_path(served_path, encoding)
+        if variant_path:
+            stats[encoding] = os.path.getsize(variant_path)
+    return stats
+
+
+def set_project_artifact(project, combined_html):
+    """
+    Publishes combined_html and points the project at it, recording raw/minified/compressed
+    sizes in Project.artifact_stats. Returns False when the project already pointed at
+    identical content.
+    """
+    content_hash = publish_artifact(combined_html)
+    if project.content_hash == content_hash:
+        return False
+    project.content_hash = content_hash
+    project.artifact_stats = build_artifact_stats(content_hash)
+    project.updated_at = now()
+    Project.objects.filter(pk=project.pk).update(
+        content_hash=content_hash, artifact_stats=project.artifact_stats, updated_at=project.updated_at
+    )
+    ProjectFile.objects.update_or_create(
+        project=project, file__endswith=COMBINED_FILE_NAME,
+        defaults={'file': get_artifact_relative_path(content_hash)}
+    )
+    return True
+
+
+def read_combined_html(project):
+    full_combined_path = os.path.join(settings.MEDIA_ROOT, get_combined_html_relative_path(project))
+    if not os.path.exists(full_combined_path):
+        logger.warning(f"Combined.html not found for project {project.id} at {full_combined_path}")
+        return ""
+    try:
+        with open(full_combined_path, "r", encoding="utf-8", errors='ignore') as f:
+            return f.read()
+    except Exception as e:
+        logger.error(f"Error reading combined.html for project {project.id}: {e}")
+        return ""
+
+
+def delete_legacy_project_folder(project):
+    """
+    Removes the pre-artifact-store folder of a project. Blobs may be shared with other
+    projects, so they are only garbage collected by the prune_artifacts command.
+    """
+    legacy_folder_path = os.path.join(settings.MEDIA_ROOT, "projects", project.get_folder_name())
+    if os.path.exists(legacy_folder_path):
+        shutil.rmtree(legacy_folder_path)
+        logger.info(f"Deleted project folder: {legacy_folder_path}")
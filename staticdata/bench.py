@@ -0,0 +1,252 @@
+"""
+Load benchmark for the hot read routes (see `manage.py bench`).
+
+seed() fills a throwaway database with synthetic data; the same options and seed always
+produce the same rows. run_routes() then drives each route from a pool of threads, each
+with its own test Client and DB connection, and reports latency percentiles and
+throughput. compare() checks a report against a saved baseline.
+"""
+import io
+import platform
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from staticdata.artifacts import (
+    build_artifact_stats,
+    build_combined_html,
+    get_artifact_relative_path,
+    publish_artifact,
+)
+from staticdata.models import Category, Project, ProjectFile, ProjectLike, UserNameDb, UserSessionData
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then reported as null.
+    resource = None
+
+BATCH_SIZE = 5000
+TABS = ["Math", "Science", "History", "Language", "Art"]
+WORDS = ["graph", "cell", "orbit", "fraction", "volcano", "poem", "vector", "atom", "empire", "color"]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _batches(items, size=BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _publish(index):
+    html = f"<main><h1>Project {index}</h1><p>{WORDS[index % len(WORDS)]} lesson {index}</p></main>"
+    css = f"h1 {{ color: #{index % 0xFFFFFF:06x}; }}"
+    js = f"console.log('project {index}');"
+    content_hash = publish_artifact(build_combined_html(f"Project {index}", html, css, js))
+    return content_hash, build_artifact_stats(content_hash)
+
+
+def seed(users, projects, likes, sessions, category_depth, category_fanout, rng, workers=4, log=print):
+    """
+    Creates the benchmark data set, each project with an on-disk combined.html. Likes are
+    spread over distinct (project, user) pairs, so `likes` may not exceed users * projects.
+    Returns the anonymous ids that own sessions, for UserSessionViewSet.latest.
+    """
+    if likes > users * projects:
+        raise ValueError(f"At most {users * projects} likes fit {users} users and {projects} projects.")
+
+    UserNameDb.objects.bulk_create(
+        (
+            UserNameDb(username=f"bench{i}", email=f"bench{i}@example.com", profile_picture="", userid=str(i), role="student")
+            for i in range(users)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(UserNameDb.objects.order_by("pk").values_list("pk", flat=True))
+    log(f"{users} users")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        artifacts = list(executor.map(_publish, range(projects)))
+    likes_per_project = [likes // projects + (1 if i < likes % projects else 0) for i in range(projects)]
+    project_ids = []
+    for batch in _batches(range(projects)):
+        created = Project.objects.bulk_create(
+            [
+                Project(
+                    name=f"Project {i}", username_id=user_ids[i % users], token="bench",
+                    description=f"A {WORDS[i % len(WORDS)]} lesson for grade {i % 12 + 1}",
+                    tabname=TABS[i % len(TABS)], gradename=f"Grade {i % 12 + 1}", subjectname=WORDS[i % len(WORDS)],
+                    content_hash=artifacts[i][0], artifact_stats=artifacts[i][1], like_count=likes_per_project[i],
+                )
+                for i in batch
+            ]
+        )
+        project_ids.extend(project.pk for project in created)
+    ProjectFile.objects.bulk_create(
+        (
+            ProjectFile(project_id=project_id, file=get_artifact_relative_path(content_hash))
+            for project_id, (content_hash, _) in zip(project_ids, artifacts)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    log(f"{projects} projects with combined.html")
+
+    # Like i goes to project i % projects from user i // projects: every pair is distinct.
+    for batch in _batches(range(likes)):
+        ProjectLike.objects.bulk_create(
+            [ProjectLike(project_id=project_ids[i % projects], username_id=user_ids[i // projects]) for i in batch]
+        )
+    call_command("rebuild_leaderboard", stdout=io.StringIO())
+    log(f"{likes} likes, leaderboard rebuilt")
+
+    anonymous_ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(max(sessions // 4, 1))]
+    for batch in _batches(range(sessions)):
+        UserSessionData.objects.bulk_create(
+            [
+                UserSessionData(
+                    anonymous_user_id=anonymous_ids[i % len(anonymous_ids)], name=f"Session {i}",
+                    topic=WORDS[i % len(WORDS)], user_points=i % 500,
+                )
+                for i in batch
+            ]
+        )
+    log(f"{sessions} sessions")
+
+    parents = [None]
+    for level in range(category_depth):
+        children = []
+        for parent in parents:
+            created = Category.objects.bulk_create(
+                [
+                    Category(
+                        name=f"Level {level} #{i}", parent=parent,
+                        category_name=f"topic-{level}-{i}" if level == category_depth - 1 else None,
+                    )
+                    for i in range(category_fanout)
+                ]
+            )
+            children.extend(created)
+        parents = children
+    log(f"{Category.objects.count()} categories")
+    return anonymous_ids
+
+
+def bench_routes(rng, anonymous_ids):
+    """(label, request factory) for each route; a factory returns (url, headers)."""
+    projects_url = reverse("staticdata:list_projects")
+    return [
+        ("list_projects summary", lambda: (f"{projects_url}?mode=summary", {})),
+        ("list_projects full page", lambda: (f"{projects_url}?page_size=20", {})),
+        ("list_projects tab", lambda: (f"{projects_url}?mode=summary&selectedTab={rng.choice(TABS)}", {})),
+        ("project_search", lambda: (f"{reverse('staticdata:project_search')}?query={rng.choice(WORDS)}", {})),
+        ("scores", lambda: (reverse("staticdata:leaderboard-list"), {})),
+        ("scores keyset", lambda: (f"{reverse('staticdata:leaderboard-list')}?cursor=", {})),
+        ("categories", lambda: (reverse("staticdata:category_list"), {})),
+        ("user_session_latest", lambda: (
+            reverse("staticdata:user-session-latest"), {"X-Anonymous-User-ID": str(rng.choice(anonymous_ids))}
+        )),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _send_all(requests, concurrency):
+    """Sends the requests from `concurrency` threads; returns ([(seconds, status), ...], wall seconds)."""
+    results = []
+
+    def worker(chunk):
+        client = Client()
+        try:
+            for url, headers in chunk:
+                start = time.perf_counter()
+                response = client.get(url, headers=headers)
+                results.append((time.perf_counter() - start, response.status_code))
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(requests[i::concurrency],)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def run_route(make_request, requests, concurrency, warmup):
+    if warmup:
+        _send_all([make_request() for _ in range(warmup)], concurrency)
+    results, wall_seconds = _send_all([make_request() for _ in range(requests)], concurrency)
+
+    latencies = sorted(elapsed * 1000 for elapsed, _ in results)
+    errors = sum(1 for _, status_code in results if status_code >= 400)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2),
+        "throughput_rps": round(requests / wall_seconds, 1),
+    }
+
+
+def run_routes(routes, requests, concurrency, warmup, log=print):
+    report = {}
+    for label, make_request in routes:
+        report[label] = run_route(make_request, requests, concurrency, warmup)
+        log(f"{label}: p50 {report[label]['p50_ms']} ms, p95 {report[label]['p95_ms']} ms, "
+            f"{report[label]['throughput_rps']} req/s")
+    return report
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "platform": platform.platform(),
+        "debug": settings.DEBUG,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """
+    Returns (route, metric, baseline, current) for every route whose p95 latency rose or whose
+    throughput fell by more than `tolerance` (a fraction) against the baseline report.
+    """
+    regressions = []
+    for label, current in report["routes"].items():
+        previous = baseline.get("routes", {}).get(label)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append((label, "p95_ms", previous["p95_ms"], current["p95_ms"]))
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append((label, "throughput_rps", previous["throughput_rps"], current["throughput_rps"]))
+    return regressions
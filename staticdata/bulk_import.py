@@ -0,0 +1,259 @@
+"""
+Bulk import of projects, the batch form of OpenSourceUploadProjectAPIView.
+
+Two formats are accepted, with the same keys as the single upload API
+(project_name, username, project_description, token, email, project_tab_name,
+project_grade_name, project_subject_name, html_content, css_content, js_content):
+
+- NDJSON: one JSON object per line.
+- zip: one folder per project holding a project.json plus optional .html/.css/.js
+  files, which take precedence over the *_content keys.
+
+Everything is validated before anything is written. Artifacts are published in
+parallel outside the transaction (unreferenced blobs from a failed import are left
+for prune_artifacts), then all rows are written in one transaction, together with
+one score update per affected owner.
+"""
+import json
+import logging
+import os
+import posixpath
+import uuid
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from staticdata.artifacts import (
+    COMBINED_FILE_NAME,
+    build_artifact_stats,
+    build_combined_html,
+    get_artifact_relative_path,
+    publish_artifact,
+)
+from staticdata.models import Project, ProjectFile, UserNameDb
+from staticdata.score_calculations import PROJECT_POINTS, apply_score_delta
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = "project.json"
+CONTENT_FIELDS = {".html": "html_content", ".css": "css_content", ".js": "js_content"}
+# payload key -> (Project field, default)
+METADATA_FIELDS = {
+    "project_description": ("description", ""),
+    "project_tab_name": ("tabname", "DefaultTab"),
+    "project_grade_name": ("gradename", "DefaultGrade"),
+    "project_subject_name": ("subjectname", "DefaultSubject"),
+}
+UPDATE_FIELDS = [
+    "description", "token", "email", "tabname", "gradename", "subjectname",
+    "content_hash", "artifact_stats", "updated_at",
+]
+BATCH_SIZE = 200
+
+
+class BulkImportError(Exception):
+    """Raised with every problem found in an import; nothing has been written when it is raised."""
+
+    def __init__(self, errors):
+        super().__init__(f"Import rejected: {len(errors)} problem(s) found.")
+        self.errors = errors
+
+
+def parse_import(stream):
+    """Returns [(source, item), ...] from a zip or NDJSON file object; source labels errors."""
+    is_zip = zipfile.is_zipfile(stream)
+    stream.seek(0)
+    return parse_zip(stream) if is_zip else parse_ndjson(stream)
+
+
+def parse_ndjson(stream):
+    entries, errors = [], []
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        source = f"line {line_number}"
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            errors.append({"source": source, "error": f"Invalid JSON: {e}"})
+            continue
+        if not isinstance(item, dict):
+            errors.append({"source": source, "error": "Expected a JSON object."})
+            continue
+        entries.append((source, item))
+    if errors:
+        raise BulkImportError(errors)
+    return entries
+
+
+def parse_zip(stream):
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile:
+        raise BulkImportError([{"source": "archive", "error": "Not a valid zip archive."}])
+
+    with archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if sum(info.file_size for info in members) > settings.BULK_IMPORT_MAX_BYTES:
+            raise BulkImportError([{"source": "archive", "error": "Archive is too large once uncompressed."}])
+
+        folders = {}
+        for info in members:
+            folders.setdefault(posixpath.dirname(info.filename), {})[posixpath.basename(info.filename)] = info
+
+        entries, errors = [], []
+        for folder, files in sorted(folders.items()):
+            if MANIFEST_FILE_NAME not in files:
+                continue
+            source = posixpath.join(folder, MANIFEST_FILE_NAME)
+            try:
+                item = json.loads(archive.read(files[MANIFEST_FILE_NAME]))
+            except ValueError as e:
+                errors.append({"source": source, "error": f"Invalid JSON: {e}"})
+                continue
+            if not isinstance(item, dict):
+                errors.append({"source": source, "error": "Expected a JSON object."})
+                continue
+            for file_name, info in sorted(files.items()):
+                field = CONTENT_FIELDS.get(os.path.splitext(file_name)[1].lower())
+                if field:
+                    item[field] = archive.read(info).decode("utf-8", errors="ignore")
+            entries.append((source, item))
+    if errors:
+        raise BulkImportError(errors)
+    return entries
+
+
+def validate_entries(entries):
+    """Checks every entry against the DB in one query and returns cleaned items."""
+    if not entries:
+        raise BulkImportError([{"source": "import", "error": "No projects found."}])
+    if len(entries) > settings.BULK_IMPORT_MAX_PROJECTS:
+        raise BulkImportError([{
+            "source": "import",
+            "error": f"At most {settings.BULK_IMPORT_MAX_PROJECTS} projects can be imported at once.",
+        }])
+
+    usernames = {item.get("username") for _, item in entries if isinstance(item.get("username"), str)}
+    users = {}
+    # Usernames are not unique; like the single upload API, the first row wins.
+    for user in UserNameDb.objects.filter(username__in=usernames).order_by("pk"):
+        users.setdefault(user.username, user)
+
+    items, errors, seen = [], [], set()
+    for source, item in entries:
+        name = item.get("project_name")
+        username = item.get("username")
+        if not isinstance(name, str) or not name.strip() or not isinstance(username, str) or not username:
+            errors.append({"source": source, "error": "Project name and username are required"})
+            continue
+        user = users.get(username)
+        if user is None:
+            errors.append({"source": source, "error": f"Username '{username}' provided does not exist."})
+            continue
+        if (username, name) in seen:
+            errors.append({"source": source, "error": f"Project '{name}' for '{username}' appears more than once."})
+            continue
+        seen.add((username, name))
+
+        cleaned = {"source": source, "name": name, "user": user}
+        values = {"name": name, "token": item.get("token"), "email": item.get("email") or user.email}
+        for key, (field, default) in METADATA_FIELDS.items():
+            values[field] = item.get(key, default)
+        problems = []
+        for field, value in values.items():
+            if value is None and field == "token":
+                continue
+            max_length = Project._meta.get_field(field).max_length
+            if not isinstance(value, str):
+                problems.append(f"'{field}' must be a string.")
+            elif max_length and len(value) > max_length:
+                problems.append(f"'{field}' is longer than {max_length} characters.")
+        for field in CONTENT_FIELDS.values():
+            cleaned[field] = item.get(field, "")
+            if not isinstance(cleaned[field], str):
+                problems.append(f"'{field}' must be a string.")
+        if problems:
+            errors.append({"source": source, "error": " ".join(problems)})
+            continue
+        cleaned.update(values)
+        items.append(cleaned)
+
+    if errors:
+        raise BulkImportError(errors)
+    return items
+
+
+def _publish_item(item):
+    combined_html = build_combined_html(item["name"], item["html_content"], item["css_content"], item["js_content"])
+    content_hash = publish_artifact(combined_html)
+    return content_hash, build_artifact_stats(content_hash)
+
+
+def import_projects(entries):
+    """
+    Creates or updates (matched on name + owner, like the single upload API) every entry.
+    Returns [(project, created), ...] in input order.
+    """
+    items = validate_entries(entries)
+
+    with ThreadPoolExecutor(max_workers=settings.BULK_IMPORT_WORKERS) as executor:
+        artifacts = list(executor.map(_publish_item, items))
+
+    timestamp = now()
+    with transaction.atomic():
+        existing = {}
+        matches = Project.objects.filter(
+            username__in=[item["user"] for item in items], name__in={item["name"] for item in items}
+        ).order_by("pk")
+        for project in matches:
+            existing.setdefault((project.username_id, project.name), project)
+
+        results, to_create, to_update = [], [], []
+        for item, (content_hash, artifact_stats) in zip(items, artifacts):
+            project = existing.get((item["user"].pk, item["name"]))
+            created = project is None
+            if created:
+                project = Project(name=item["name"], username=item["user"], token=item["token"] or str(uuid.uuid4())[:8])
+                to_create.append(project)
+            else:
+                project.token = item["token"] or project.token
+                to_update.append(project)
+            for field, _ in METADATA_FIELDS.values():
+                setattr(project, field, item[field])
+            project.email = item["email"]
+            project.content_hash = content_hash
+            project.artifact_stats = artifact_stats
+            project.updated_at = timestamp
+            results.append((project, created))
+
+        Project.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        Project.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=BATCH_SIZE)
+
+        combined_files = {
+            project_file.project_id: project_file
+            for project_file in ProjectFile.objects.filter(project__in=to_update, file__endswith=COMBINED_FILE_NAME)
+        }
+        new_files, changed_files = [], []
+        for project, _ in results:
+            relative_path = get_artifact_relative_path(project.content_hash)
+            project_file = combined_files.get(project.pk)
+            if project_file is None:
+                new_files.append(ProjectFile(project=project, file=relative_path))
+            elif project_file.file.name != relative_path:
+                project_file.file = relative_path
+                changed_files.append(project_file)
+        ProjectFile.objects.bulk_create(new_files, batch_size=BATCH_SIZE)
+        ProjectFile.objects.bulk_update(changed_files, ["file"], batch_size=BATCH_SIZE)
+
+        new_projects_per_owner = Counter(project.username_id for project in to_create)
+        owners = {item["user"].pk: item["user"] for item in items}
+        for owner_id, new_projects in new_projects_per_owner.items():
+            apply_score_delta(owners[owner_id], new_projects * PROJECT_POINTS)
+
+    logger.info(f"Bulk import: {len(to_create)} created, {len(to_update)} updated.")
+    return results
@@ -0,0 +1,49 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Strong ETag over the given validator parts."""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def project_etag(project, *extra):
+    # updated_at is bumped on every edit, like and comment and content_hash changes with the
+    # HTML, so together they identify every representation of a project.
+    return make_etag(project.pk, project.updated_at.isoformat(), project.content_hash, *extra)
+
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def add_validators(response, etag, last_modified=None, private=False, immutable=False):
+    response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+    # Caches may store the response but must revalidate it, which is a 304 when nothing changed.
+    # Content-addressed URLs never change, so those may be cached for a year without revalidation.
+    if immutable:
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    elif private:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+        patch_vary_headers(response, ["Authorization"])
+    return response
+
+
+def conditional_response(request, etag, last_modified=None, private=False, immutable=False):
+    """
+    Returns a 304 (or 412) response when the request's If-None-Match / If-Modified-Since
+    validators match, otherwise None so the view builds the full payload.
+    """
+    response = get_conditional_response(
+        request, etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        add_validators(response, etag, last_modified, private=private, immutable=immutable)
+    return response
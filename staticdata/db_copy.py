@@ -0,0 +1,109 @@
+"""
+Bulk copy of every table from a SQLite file into the configured database (see
+`manage.py copy_from_sqlite`).
+
+The source file is opened as an extra, query-only connection alias. Rows are read in pk
+order with Django's converters applied (JSON, UUIDs, datetimes, booleans) and inserted in
+batches with executemany. The inserts bypass the ORM save path, so auto_now timestamps and
+model signals leave the copied values alone. The whole copy is one transaction on the
+target, so the foreign keys are checked once, at commit, and a failed copy leaves the
+target as it was.
+"""
+from itertools import islice
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+
+SOURCE_ALIAS = "copy_source"
+BATCH_SIZE = 2000
+
+
+def open_source(path):
+    """Registers the SQLite file at `path` as the SOURCE_ALIAS connection."""
+    settings_dict = connections.configure_settings({
+        DEFAULT_DB_ALIAS: {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": str(path),
+            "OPTIONS": {"init_command": "PRAGMA query_only=ON"},
+        }
+    })[DEFAULT_DB_ALIAS]
+    connections.settings[SOURCE_ALIAS] = settings_dict
+    return connections[SOURCE_ALIAS]
+
+
+def close_source():
+    connections[SOURCE_ALIAS].close()
+    del connections[SOURCE_ALIAS]
+    del connections.settings[SOURCE_ALIAS]
+
+
+def copied_models(source):
+    """Concrete models with a table in the source, including auto-created m2m tables."""
+    source_tables = set(source.introspection.table_names())
+    return [
+        model
+        for model in apps.get_models(include_auto_created=True)
+        if model._meta.managed and not model._meta.proxy and model._meta.db_table in source_tables
+    ]
+
+
+def copy_model(model, source, target, batch_size, log):
+    fields = model._meta.local_concrete_fields
+    quote_name = target.ops.quote_name
+    sql = (
+        f"INSERT INTO {quote_name(model._meta.db_table)} "
+        f"({', '.join(quote_name(field.column) for field in fields)}) "
+        f"VALUES ({', '.join(['%s'] * len(fields))})"
+    )
+    rows = (
+        model._base_manager.using(source.alias)
+        .order_by("pk")
+        .values_list(*(field.attname for field in fields))
+        .iterator(chunk_size=batch_size)
+    )
+    copied = 0
+    while batch := list(islice(rows, batch_size)):
+        with target.cursor() as cursor:
+            cursor.executemany(
+                sql, [[field.get_db_prep_save(value, target) for field, value in zip(fields, row)] for row in batch]
+            )
+        copied += len(batch)
+    log(f"{model._meta.label}: {copied} rows")
+    return copied
+
+
+def copy_database(path, target_alias=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE, log=print):
+    """
+    Replaces the rows of every table the SQLite file at `path` shares with the target by the
+    file's rows. Both must be migrated to the same state; raises ValueError if the file is
+    behind. Returns {model label: rows copied}.
+    """
+    target = connections[target_alias]
+    source = open_source(path)
+    try:
+        missing = sorted(
+            set(MigrationRecorder(target).applied_migrations()) - set(MigrationRecorder(source).applied_migrations())
+        )
+        if missing:
+            raise ValueError(
+                f"{path} lacks {len(missing)} migration(s) the target has, starting with "
+                f"{missing[0][0]}.{missing[0][1]}; migrate it first."
+            )
+        models = copied_models(source)
+        counts = {}
+        with transaction.atomic(using=target_alias):
+            flush_sql = target.ops.sql_flush(
+                no_style(), [model._meta.db_table for model in models], allow_cascade=True
+            )
+            target.ops.execute_sql_flush(flush_sql)
+            for model in models:
+                counts[model._meta.label] = copy_model(model, source, target, batch_size, log)
+            # Rows were inserted with their primary keys; move the id sequences past them.
+            with target.cursor() as cursor:
+                for statement in target.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(statement)
+        return counts
+    finally:
+        close_source()
@@ -0,0 +1,114 @@
+"""
+Caller identity from the Authorization header, which carries a UserNameDb username.
+
+VisoraUserMiddleware sets request.visora_user lazily, so a request resolves its caller at
+most once and views that never look at it cost nothing. Known users are cached for
+VISORA_USER_CACHE_TTL seconds: per process in a bounded TTL cache by default, or in the
+Django cache named by VISORA_USER_CACHE_ALIAS so that several workers share entries and an
+invalidation reaches all of them. Unknown usernames are never cached, so a user registered
+through another worker is recognised on their very next request.
+"""
+import hashlib
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import SimpleLazyObject
+
+from staticdata.models import UserNameDb
+
+CACHE_KEY_PREFIX = "visora_user:"
+
+_local_cache = None
+_local_lock = threading.Lock()
+
+
+def _field_names():
+    return [field.attname for field in UserNameDb._meta.concrete_fields]
+
+
+def _cache_key(username):
+    # Usernames are free-form; hashing keeps keys valid for memcached.
+    return CACHE_KEY_PREFIX + hashlib.sha256(username.encode("utf-8")).hexdigest()
+
+
+def _get_local_cache():
+    global _local_cache
+    if _local_cache is None:
+        _local_cache = TTLCache(maxsize=settings.VISORA_USER_CACHE_SIZE, ttl=settings.VISORA_USER_CACHE_TTL)
+    return _local_cache
+
+
+def _cache_get(key):
+    if settings.VISORA_USER_CACHE_ALIAS:
+        return caches[settings.VISORA_USER_CACHE_ALIAS].get(key)
+    with _local_lock:
+        return _get_local_cache().get(key)
+
+
+def _cache_set(key, values):
+    if settings.VISORA_USER_CACHE_ALIAS:
+        caches[settings.VISORA_USER_CACHE_ALIAS].set(key, values, settings.VISORA_USER_CACHE_TTL)
+        return
+    with _local_lock:
+        _get_local_cache()[key] = values
+
+
+def resolve_visora_user(username):
+    """
+    Returns the UserNameDb row for username, or None. Usernames are not unique; like the
+    rest of the API, the first row wins. Each call hands out a fresh instance built from
+    the cached field values, so callers may modify it freely.
+    """
+    if not username or not settings.VISORA_USER_CACHE_TTL:
+        return UserNameDb.objects.filter(username=username).order_by("pk").first() if username else None
+    field_names = _field_names()
+    key = _cache_key(username)
+    values = _cache_get(key)
+    if values is None:
+        values = UserNameDb.objects.filter(username=username).order_by("pk").values_list(*field_names).first()
+        if values is None:
+            return None
+        _cache_set(key, tuple(values))
+    return UserNameDb.from_db(DEFAULT_DB_ALIAS, field_names, values)
+
+
+def invalidate_visora_user(username):
+    """Drops the cached entry for username; call it whenever that user is created or changed."""
+    if not username:
+        return
+    key = _cache_key(username)
+    if settings.VISORA_USER_CACHE_ALIAS:
+        caches[settings.VISORA_USER_CACHE_ALIAS].delete(key)
+        return
+    with _local_lock:
+        _get_local_cache().pop(key, None)
+
+
+def get_visora_user(request):
+    """request.visora_user, resolving it here when VisoraUserMiddleware is not installed."""
+    user = getattr(request, "visora_user", None)
+    if user is None:
+        user = resolve_visora_user(request.headers.get("Authorization"))
+    return user or None
+
+
+class VisoraUserMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # Under ASGI get_response is a coroutine function and this returns its awaitable. The
+        # lazy lookup queries the database, so async views must not touch request.visora_user.
+        request.visora_user = SimpleLazyObject(
+            lambda: resolve_visora_user(request.headers.get("Authorization"))
+        )
+        return self.get_response(request)
@@ -0,0 +1,167 @@
+"""
+DB-backed queue for upload processing, so no external broker is needed.
+
+Uploads enqueue an UploadJob; the process_upload_jobs command claims jobs with a
+conditional UPDATE (compare-and-set on status/lease), which is safe with several
+workers on any database. A worker holds a lease while it runs a job and extends
+it at every progress step. If the worker dies, the lease expires and another
+worker re-runs the job, so every job is processed at least once; failures are
+retried with exponential backoff up to UploadJob.max_attempts.
+
+Uploads of one project publish in the order they arrived, whichever worker finishes
+first: a new upload supersedes the project's pending jobs, and a job only points the
+project at its artifact while it is still the project's newest job. Both steps run
+under a lock on the project row.
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from staticdata.artifacts import build_combined_html, publish_artifact, set_project_artifact
+from staticdata.models import Project, UploadJob
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CANDIDATES = 10
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def lock_project(project):
+    """Row lock on the project for the rest of the transaction (SQLite serializes the whole write instead)."""
+    list(Project.objects.select_for_update().filter(pk=project.pk).values_list("pk", flat=True))
+
+
+def supersede_pending_jobs(project, exclude=None):
+    """Marks the project's queued and running jobs superseded and drops their payloads."""
+    current_time = now()
+    pending = UploadJob.objects.filter(project=project, status__in=[UploadJob.QUEUED, UploadJob.RUNNING])
+    if exclude is not None:
+        pending = pending.exclude(pk=exclude.pk)
+    return pending.update(status=UploadJob.SUPERSEDED, payload={}, finished_at=current_time, updated_at=current_time,
+                          locked_by='', locked_until=None)
+
+
+def is_newest_job(job):
+    """True while job is still running and no later upload job exists for its project."""
+    running = UploadJob.objects.filter(pk=job.pk, status=UploadJob.RUNNING).exists()
+    return running and not UploadJob.objects.filter(project_id=job.project_id, created_at__gt=job.created_at).exists()
+
+
+def publish_project_upload(project, html_content, css_content, js_content, on_progress=None, job=None):
+    """
+    The slow half of an upload: builds and publishes combined.html and points the project at
+    it. Used inline by the upload views, where it supersedes any pending job, and by queued
+    jobs, where it leaves the project alone once `job` is no longer the newest upload.
+    Returns whether the project was pointed at the upload; safe to re-run.
+    """
+    combined_html = build_combined_html(project.name, html_content, css_content, js_content)
+    if on_progress:
+        on_progress(50)
+    # The blob write is the slow part and needs no lock; set_project_artifact then finds it in place.
+    publish_artifact(combined_html)
+    with transaction.atomic():
+        lock_project(project)
+        if job is None:
+            supersede_pending_jobs(project)
+        elif not is_newest_job(job):
+            return False
+        set_project_artifact(project, combined_html)
+    return True
+
+
+def enqueue_upload(project, html_content, css_content, js_content):
+    with transaction.atomic():
+        lock_project(project)
+        job = UploadJob.objects.create(
+            project=project,
+            payload={"html_content": html_content, "css_content": css_content, "js_content": js_content},
+            max_attempts=settings.UPLOAD_JOB_MAX_ATTEMPTS,
+        )
+        superseded = supersede_pending_jobs(project, exclude=job)
+    if superseded:
+        logger.info(f"Upload job {job.pk} superseded {superseded} pending job(s) of project {project.pk}.")
+    return job
+
+
+def _claimable(current_time):
+    return (
+        Q(status=UploadJob.QUEUED, available_at__lte=current_time)
+        | Q(status=UploadJob.RUNNING, locked_until__lt=current_time)
+    ) & Q(attempts__lt=F("max_attempts"))
+
+
+def claim_next_job(worker_id, lease_seconds):
+    """Takes the oldest runnable job (or one whose lease expired) for worker_id, or returns None."""
+    current_time = now()
+    expired = UploadJob.objects.filter(
+        status=UploadJob.RUNNING, locked_until__lt=current_time, attempts__gte=F("max_attempts")
+    ).update(status=UploadJob.FAILED, finished_at=current_time, updated_at=current_time, locked_by='',
+             locked_until=None, last_error="Lease expired on the final attempt.")
+    if expired:
+        logger.warning(f"Marked {expired} upload job(s) failed after their final lease expired.")
+
+    candidates = UploadJob.objects.filter(_claimable(current_time)).order_by("available_at").values_list("pk", flat=True)
+    for job_id in candidates[:CLAIM_CANDIDATES]:
+        # Only one worker's UPDATE can match: the others see the new status/lease and get 0 rows.
+        claimed = UploadJob.objects.filter(_claimable(current_time), pk=job_id).update(
+            status=UploadJob.RUNNING,
+            locked_by=worker_id,
+            locked_until=current_time + timedelta(seconds=lease_seconds),
+            attempts=F("attempts") + 1,
+            progress=0,
+            updated_at=current_time,
+        )
+        if claimed:
+            return UploadJob.objects.select_related("project").get(pk=job_id)
+    return None
+
+
+def run_job(job, worker_id, lease_seconds):
+    """
+    Processes a claimed job and records the outcome. Returns False when it failed; a job
+    that a newer upload superseded counts as done.
+    """
+    owned = UploadJob.objects.filter(pk=job.pk, status=UploadJob.RUNNING, locked_by=worker_id)
+
+    def on_progress(progress):
+        # Doubles as the lease heartbeat.
+        owned.update(progress=progress, locked_until=now() + timedelta(seconds=lease_seconds), updated_at=now())
+
+    try:
+        published = publish_project_upload(
+            job.project,
+            job.payload.get("html_content", ""),
+            job.payload.get("css_content", ""),
+            job.payload.get("js_content", ""),
+            on_progress=on_progress,
+            job=job,
+        )
+    except Exception as e:
+        logger.error(f"Upload job {job.pk} failed on attempt {job.attempts}/{job.max_attempts}: {e}")
+        if job.attempts >= job.max_attempts:
+            owned.update(status=UploadJob.FAILED, last_error=str(e), finished_at=now(), updated_at=now(),
+                         locked_by='', locked_until=None)
+        else:
+            delay = min(settings.UPLOAD_JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1), settings.UPLOAD_JOB_RETRY_MAX_SECONDS)
+            owned.update(status=UploadJob.QUEUED, last_error=str(e), available_at=now() + timedelta(seconds=delay),
+                         updated_at=now(), locked_by='', locked_until=None)
+        return False
+
+    if not published:
+        logger.info(f"Upload job {job.pk} was superseded by a newer upload of project {job.project_id}.")
+        owned.update(status=UploadJob.SUPERSEDED, payload={}, finished_at=now(), updated_at=now(),
+                     locked_by='', locked_until=None)
+        return True
+
+    # 0 rows when the lease was lost to another worker, which then owns the outcome.
+    return bool(owned.update(status=UploadJob.SUCCEEDED, progress=100, payload={}, last_error='', finished_at=now(),
+                             updated_at=now(), locked_by='', locked_until=None))
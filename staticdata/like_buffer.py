@@ -0,0 +1,63 @@
+"""
+Write-behind buffer for like counters (settings.LIKE_WRITE_BEHIND).
+
+With it on, a like still inserts/deletes its ProjectLike row (so uniqueness and is_liked
+stay exact) but only appends a PendingLikeDelta instead of updating the hot Project and
+Leaderboard rows. The flush_like_deltas command folds pending deltas into like_count and
+owner scores in batches, so Project.like_count lags by at most one flush interval and a
+trending project no longer funnels every like through the same two rows.
+"""
+import uuid
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils.timezone import now
+
+from staticdata.models import PendingLikeDelta, Project, UserNameDb
+from staticdata.score_calculations import LIKE_POINTS, apply_score_delta
+
+
+def buffer_like_delta(project, delta):
+    PendingLikeDelta.objects.create(project=project, delta=delta)
+
+
+def buffered_like_count(project):
+    """like_count plus the project's pending deltas, so callers see their own like at once."""
+    row = Project.objects.filter(pk=project.pk).values("like_count").annotate(
+        pending=Coalesce(Sum("pending_like_deltas__delta"), 0)
+    ).get()
+    return max(row["like_count"] + row["pending"], 0)
+
+
+def flush_like_deltas(limit=5000):
+    """
+    Applies up to `limit` pending deltas in one transaction, with one counter UPDATE per project
+    and one score delta per owner. Rows are claimed with a conditional UPDATE, so concurrent
+    flushers never apply the same delta twice. Returns the number of deltas applied.
+    """
+    batch = uuid.uuid4().hex
+    with transaction.atomic():
+        candidate_ids = list(PendingLikeDelta.objects.filter(batch='').order_by("id").values_list("id", flat=True)[:limit])
+        if not candidate_ids:
+            return 0
+        claimed = PendingLikeDelta.objects.filter(id__in=candidate_ids, batch='').update(batch=batch)
+        per_project = (
+            PendingLikeDelta.objects.filter(batch=batch)
+            .order_by()
+            .values("project", "project__username")
+            .annotate(total=Sum("delta"))
+        )
+        owner_points = Counter()
+        for row in per_project:
+            if not row["total"]:
+                continue
+            Project.objects.filter(pk=row["project"]).update(like_count=F("like_count") + row["total"], updated_at=now())
+            if row["project__username"]:
+                owner_points[row["project__username"]] += row["total"] * LIKE_POINTS
+        owners = UserNameDb.objects.in_bulk(list(owner_points))
+        for owner_id, points in owner_points.items():
+            apply_score_delta(owners.get(owner_id), points)
+        PendingLikeDelta.objects.filter(batch=batch).delete()
+    return claimed
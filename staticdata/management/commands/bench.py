@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+)
+
+from staticdata.bench import bench_routes, compare, environment, peak_rss_mb, run_routes, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway database with synthetic data, load-tests the hot read routes with "
+        "concurrent clients and reports latency percentiles, throughput and peak RSS as JSON. "
+        "The configured database is never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--projects", type=int, default=50000, help="Each gets an on-disk combined.html.")
+        parser.add_argument("--likes", type=int, default=1000000)
+        parser.add_argument("--sessions", type=int, default=200000, help="UserSessionData rows.")
+        parser.add_argument("--category-depth", type=int, default=4)
+        parser.add_argument("--category-fanout", type=int, default=6)
+        parser.add_argument("--requests", type=int, default=200, help="Timed requests per route.")
+        parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per route sent first.")
+        parser.add_argument("--concurrency", type=int, default=8, help="Client threads per route.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed gives the same data and requests.")
+        parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+        parser.add_argument("--baseline", help="Compare against this report; exits with an error on regressions.")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95/throughput change vs the baseline (0.2 = 20%%).")
+        parser.add_argument("--save-baseline", action="store_true", help="Write the report to --baseline instead of comparing.")
+
+    def handle(self, *args, **options):
+        if options["save_baseline"] and not options["baseline"]:
+            raise CommandError("--save-baseline needs --baseline <path>.")
+        if options["likes"] > options["users"] * options["projects"]:
+            raise CommandError("--likes may not exceed --users times --projects.")
+        log = lambda message: self.stderr.write(message)
+        rng = random.Random(options["seed"])
+
+        work_dir = tempfile.mkdtemp(prefix="visora-bench-")
+        setup_test_environment(debug=False)
+        if connection.vendor == "sqlite":
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(work_dir, "bench.sqlite3")
+        # Also points mirrors such as the read replica at the test database.
+        old_config = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+        # Per-request log lines would dominate the timings of the cheaper routes.
+        logging.disable(logging.WARNING)
+        try:
+            with override_settings(MEDIA_ROOT=os.path.join(work_dir, "media")):
+                started = time.perf_counter()
+                anonymous_ids = seed(
+                    options["users"], options["projects"], options["likes"], options["sessions"],
+                    options["category_depth"], options["category_fanout"], rng, log=log,
+                )
+                seed_seconds = round(time.perf_counter() - started, 1)
+                bench_environment = environment()
+                rss_after_seed = peak_rss_mb()
+                routes = run_routes(
+                    bench_routes(rng, anonymous_ids), options["requests"], options["concurrency"], options["warmup"], log=log
+                )
+        finally:
+            logging.disable(logging.NOTSET)
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        report = {
+            "config": {
+                key: options[key]
+                for key in ("users", "projects", "likes", "sessions", "category_depth", "category_fanout",
+                            "requests", "warmup", "concurrency", "seed")
+            },
+            "environment": bench_environment,
+            "seed_seconds": seed_seconds,
+            "peak_rss_mb": {"after_seed": rss_after_seed, "after_run": peak_rss_mb()},
+            "routes": routes,
+        }
+        report_json = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                output_file.write(report_json + "\n")
+        else:
+            self.stdout.write(report_json)
+
+        if options["save_baseline"]:
+            with open(options["baseline"], "w") as baseline_file:
+                baseline_file.write(report_json + "\n")
+            log(self.style.SUCCESS(f"Baseline saved to {options['baseline']}."))
+        elif options["baseline"]:
+            with open(options["baseline"]) as baseline_file:
+                baseline = json.load(baseline_file)
+            if baseline.get("config") != report["config"]:
+                log(self.style.WARNING("Baseline was recorded with a different configuration."))
+            regressions = compare(report, baseline, options["tolerance"])
+            if regressions:
+                for route, metric, before, after in regressions:
+                    log(f"{route}: {metric} {before} -> {after}")
+                raise CommandError(f"{len(regressions)} regression(s) beyond {options['tolerance']:.0%} of the baseline.")
+            log(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from staticdata.db_copy import BATCH_SIZE, copy_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies every table of a SQLite database (such as the old db.sqlite3) into the configured "
+        "database in bulk batches, replacing the rows already there. Run migrate on the target first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="The SQLite file to copy from.")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="The database alias to copy into.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows read and inserted per batch.")
+        parser.add_argument("--noinput", "--no-input", action="store_false", dest="interactive",
+                            help="Do not ask before replacing the target's rows.")
+
+    def handle(self, *args, **options):
+        target = connections[options["database"]]
+        if target.vendor == "sqlite" and str(target.settings_dict["NAME"]) == options["path"]:
+            raise CommandError("The source and the target are the same database.")
+        if options["interactive"]:
+            answer = input(
+                f"This replaces all rows in the '{options['database']}' database ({target.vendor}: "
+                f"{target.settings_dict['NAME']}) with those of {options['path']}. Type 'yes' to continue: "
+            )
+            if answer != "yes":
+                raise CommandError("Copy cancelled.")
+
+        try:
+            counts = copy_database(
+                options["path"], options["database"], options["batch_size"], log=lambda message: self.stdout.write(message)
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {sum(counts.values())} rows from {len(counts)} tables."
+        ))
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from staticdata.jobs import default_worker_id
+from staticdata.score_calculations import claim_dirty_owners, flush_dirty_owner
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the scores of owners marked dirty by likes/comments/uploads, at most once per "
+        "interval each. Safe to run in several processes at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once nothing is due instead of polling.")
+        parser.add_argument("--poll-seconds", type=float, default=1.0, help="Sleep between polls when nothing is due.")
+        parser.add_argument(
+            "--interval-seconds", type=int, default=settings.SCORE_FLUSH_INTERVAL_SECONDS,
+            help="Minimum time between two recomputes of the same owner.",
+        )
+        parser.add_argument("--batch-size", type=int, default=100, help="Owners claimed per poll.")
+        parser.add_argument("--lease-seconds", type=int, default=60, help="How long a claimed owner stays locked.")
+        parser.add_argument("--worker-id", default=default_worker_id(), help="Recorded on claimed rows (default host:pid).")
+
+    def handle(self, *args, **options):
+        worker_id = options["worker_id"]
+        flushed = 0
+        try:
+            while True:
+                user_ids = claim_dirty_owners(worker_id, options["lease_seconds"], options["batch_size"])
+                if not user_ids:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_seconds"])
+                    continue
+                for user_id in user_ids:
+                    if flush_dirty_owner(user_id, worker_id, options["interval_seconds"]):
+                        flushed += 1
+        except KeyboardInterrupt:
+            # Claimed rows are still dirty and are picked up again once their lease expires.
+            self.stdout.write("Interrupted.")
+        self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} owner score(s)."))
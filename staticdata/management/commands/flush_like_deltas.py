@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from staticdata.like_buffer import flush_like_deltas
+
+
+class Command(BaseCommand):
+    help = "Folds buffered likes (LIKE_WRITE_BEHIND) into project like counts and owner scores."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Flush what is pending and exit.")
+        parser.add_argument(
+            "--interval-seconds", type=float, default=settings.LIKE_FLUSH_INTERVAL_SECONDS,
+            help="Time between flushes, i.e. the maximum staleness of like counts.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000, help="Deltas applied per transaction.")
+
+    def handle(self, *args, **options):
+        applied = 0
+        try:
+            while True:
+                flushed = flush_like_deltas(options["batch_size"])
+                applied += flushed
+                if flushed == options["batch_size"]:
+                    continue  # Backlog: keep going without sleeping.
+                if options["once"]:
+                    break
+                time.sleep(options["interval_seconds"])
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted.")
+        self.stdout.write(self.style.SUCCESS(f"Applied {applied} buffered like(s)."))
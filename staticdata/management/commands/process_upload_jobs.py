@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from staticdata.jobs import claim_next_job, default_worker_id, run_job
+
+
+class Command(BaseCommand):
+    help = "Runs queued upload jobs. Any number of workers can run side by side."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit once no job is runnable instead of polling.")
+        parser.add_argument("--poll-seconds", type=float, default=2.0, help="Sleep between polls of an empty queue.")
+        parser.add_argument(
+            "--lease-seconds", type=int, default=settings.UPLOAD_JOB_LEASE_SECONDS,
+            help="How long a job stays claimed without progress before another worker may retry it.",
+        )
+        parser.add_argument("--worker-id", default=default_worker_id(), help="Recorded on claimed jobs (default host:pid).")
+
+    def handle(self, *args, **options):
+        worker_id = options["worker_id"]
+        lease_seconds = options["lease_seconds"]
+        succeeded = failed = 0
+        self.stdout.write(f"Upload worker {worker_id} started.")
+        try:
+            while True:
+                job = claim_next_job(worker_id, lease_seconds)
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_seconds"])
+                    continue
+                if run_job(job, worker_id, lease_seconds):
+                    succeeded += 1
+                else:
+                    failed += 1
+        except KeyboardInterrupt:
+            # A job interrupted mid-run keeps its lease and is retried once the lease expires.
+            self.stdout.write("Interrupted.")
+        self.stdout.write(self.style.SUCCESS(f"Processed {succeeded + failed} job(s): {succeeded} succeeded, {failed} failed."))
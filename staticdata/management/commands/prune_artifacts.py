@@ -0,0 +1,65 @@
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from staticdata.artifacts import ARTIFACTS_DIR
+from staticdata.models import Project
+
+
+class Command(BaseCommand):
+    help = "Removes artifact blobs and legacy project folders that no project points at."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-seconds", type=int, default=3600,
+            help="Skip anything published or reused more recently than this, so blobs being published are never removed.",
+        )
+        parser.add_argument("--legacy", action="store_true", help="Also remove orphaned media/projects/<folder> directories.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed.")
+
+    def handle(self, *args, **options):
+        cutoff = time.time() - options["grace_seconds"]
+        dry_run = options["dry_run"]
+        referenced_hashes = set(Project.objects.exclude(content_hash="").values_list("content_hash", flat=True))
+
+        removed = 0
+        artifacts_root = os.path.join(settings.MEDIA_ROOT, ARTIFACTS_DIR)
+        if os.path.isdir(artifacts_root):
+            for shard in os.listdir(artifacts_root):
+                shard_path = os.path.join(artifacts_root, shard)
+                if not os.path.isdir(shard_path):
+                    continue
+                for content_hash in os.listdir(shard_path):
+                    blob_path = os.path.join(shard_path, content_hash)
+                    if content_hash in referenced_hashes or os.path.getmtime(blob_path) > cutoff:
+                        continue
+                    # A project may have been pointed at the blob since referenced_hashes was read.
+                    if Project.objects.filter(content_hash=content_hash).exists():
+                        continue
+                    removed += self._remove(blob_path, dry_run)
+
+        if options["legacy"]:
+            # Folders of projects that already moved to the artifact store are orphaned too.
+            live_folders = {
+                project.get_folder_name()
+                for project in Project.objects.filter(content_hash="").only("name", "token")
+            }
+            projects_root = os.path.join(settings.MEDIA_ROOT, "projects")
+            if os.path.isdir(projects_root):
+                for folder_name in os.listdir(projects_root):
+                    folder_path = os.path.join(projects_root, folder_name)
+                    if not os.path.isdir(folder_path) or folder_name in live_folders or os.path.getmtime(folder_path) > cutoff:
+                        continue
+                    removed += self._remove(folder_path, dry_run)
+
+        verb = "Would remove" if dry_run else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} unreferenced artifact folder(s)."))
+
+    def _remove(self, path, dry_run):
+        self.stdout.write(f"{'[dry-run] ' if dry_run else ''}Removing {path}")
+        if not dry_run:
+            shutil.rmtree(path, ignore_errors=True)
+        return 1
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import IntegerField, Sum
+from django.utils.timezone import now
+
+from staticdata.models import Leaderboard, Project
+from staticdata.score_calculations import PROJECT_SCORE
+
+
+class Command(BaseCommand):
+    help = "Recomputes every leaderboard score from the project counters with one GROUP BY query."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report entries whose score drifted.")
+
+    def handle(self, *args, **options):
+        expected_scores = dict(
+            Project.objects.filter(username__isnull=False)
+            .order_by()
+            .values("username")
+            .annotate(score=Sum(PROJECT_SCORE, output_field=IntegerField()))
+            .values_list("username", "score")
+        )
+
+        drifted = []
+        seen_user_ids = set()
+        for entry in Leaderboard.objects.only("id", "user_id", "score"):
+            seen_user_ids.add(entry.user_id)
+            expected = expected_scores.get(entry.user_id, 0)
+            if entry.score != expected:
+                entry.score = expected
+                drifted.append(entry)
+        missing = [
+            Leaderboard(user_id=user_id, score=score)
+            for user_id, score in expected_scores.items() if user_id not in seen_user_ids
+        ]
+
+        if not drifted and not missing:
+            self.stdout.write(self.style.SUCCESS("All leaderboard scores are in sync."))
+            return
+        self.stdout.write(f"{len(drifted)} drifted and {len(missing)} missing leaderboard entr(y/ies).")
+        if options["dry_run"]:
+            return
+
+        timestamp = now()
+        for entry in drifted:
+            entry.updated_at = timestamp
+        with transaction.atomic():
+            Leaderboard.objects.bulk_update(drifted, ["score", "updated_at"], batch_size=500)
+            Leaderboard.objects.bulk_create(missing, batch_size=500)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(drifted) + len(missing)} leaderboard entr(y/ies)."))
@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from staticdata.models import ScoreDailyBucket
+from staticdata.score_calculations import WINDOW_DAYS, rebuild_leaderboard_snapshots, rebuild_score_buckets
+
+
+class Command(BaseCommand):
+    help = (
+        "Refreshes the daily/weekly/all-time leaderboard snapshots. Meant to run on a schedule "
+        "(e.g. cron every few minutes); each run only re-aggregates the most recent days."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=2,
+            help="Recompute this many recent daily buckets (default 2, so events around midnight are caught).",
+        )
+        parser.add_argument(
+            "--backfill", action="store_true",
+            help="Recompute buckets for the longest window; implied when no buckets exist yet.",
+        )
+
+    def handle(self, *args, **options):
+        today = now().date()
+        longest_window = max(WINDOW_DAYS.values())
+        days = options["days"]
+        if options["backfill"] or not ScoreDailyBucket.objects.exists():
+            days = longest_window
+        first_day = today - timedelta(days=max(days, 1) - 1)
+
+        buckets = rebuild_score_buckets(first_day)
+        pruned, _ = ScoreDailyBucket.objects.filter(day__lte=today - timedelta(days=longest_window)).delete()
+        ranked = rebuild_leaderboard_snapshots(today)
+
+        self.stdout.write(f"Recomputed {buckets} bucket(s) since {first_day}; pruned {pruned} expired bucket(s).")
+        summary = ", ".join(f"{window}: {count}" for window, count in ranked.items())
+        self.stdout.write(self.style.SUCCESS(f"Snapshots rebuilt ({summary})."))
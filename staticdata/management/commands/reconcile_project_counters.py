@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.timezone import now
+
+from staticdata.models import PendingLikeDelta, Project, ProjectComment, ProjectLike
+
+
+def count_subquery(model):
+    return Coalesce(Subquery(
+        model.objects.filter(project=OuterRef("pk")).order_by().values("project").annotate(c=Count("pk")).values("c")
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = "Recounts Project.like_count / comment_count from ProjectLike and ProjectComment in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report projects whose counters drifted.")
+
+    def handle(self, *args, **options):
+        drifted_ids = list(
+            Project.objects
+            # Buffered likes (LIKE_WRITE_BEHIND) are already counted in ProjectLike but not yet in
+            # like_count; those projects are left to flush_like_deltas.
+            .exclude(pk__in=PendingLikeDelta.objects.values("project"))
+            .annotate(actual_likes=count_subquery(ProjectLike), actual_comments=count_subquery(ProjectComment))
+            .filter(~Q(like_count=F("actual_likes")) | ~Q(comment_count=F("actual_comments")))
+            .values_list("pk", flat=True)
+        )
+        if not drifted_ids:
+            self.stdout.write(self.style.SUCCESS("All project counters are in sync."))
+            return
+        if options["dry_run"]:
+            self.stdout.write(f"{len(drifted_ids)} project(s) have drifted counters.")
+            return
+
+        # updated_at is bumped so ETags of the corrected projects change too.
+        updated = Project.objects.filter(pk__in=drifted_ids).update(
+            like_count=count_subquery(ProjectLike),
+            comment_count=count_subquery(ProjectComment),
+            updated_at=now(),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Reconciled counters for {updated} project(s)."))
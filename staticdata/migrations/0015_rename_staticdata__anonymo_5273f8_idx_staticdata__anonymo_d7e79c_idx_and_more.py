@@ -16,11 +16,18 @@ class Migration(migrations.Migration):
             new_name="staticdata__anonymo_d7e79c_idx",
             old_name="staticdata__anonymo_5273f8_idx",
         ),
-        migrations.AlterField(
-            model_name="usersessiondata",
-            name="anonymous_user_id",
-            field=models.ForeignKey(
-                on_delete=django.db.models.deletion.CASCADE, to="staticdata.usernamedb"
-            ),
+        # State only: the column ends up unchanged after 0016, and Postgres cannot cast
+        # the uuid column to the foreign key's bigint and back.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="usersessiondata",
+                    name="anonymous_user_id",
+                    field=models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="staticdata.usernamedb",
+                    ),
+                ),
+            ],
         ),
     ]
@@ -13,16 +13,24 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
+        # State only: the column ends up unchanged after 0016, and Postgres cannot cast
+        # the uuid column to the foreign key's bigint and back. It runs before the rename,
+        # which SQLite performs by recreating the index from the state's column.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="usersessiondata",
+                    name="anonymous_user_id",
+                    field=models.UUIDField(
+                        db_index=True,
+                        help_text="UUID identifying the anonymous user/browser.",
+                    ),
+                ),
+            ],
+        ),
         migrations.RenameIndex(
             model_name="usersessiondata",
             new_name="staticdata__anonymo_5273f8_idx",
             old_name="staticdata__anonymo_d7e79c_idx",
         ),
-        migrations.AlterField(
-            model_name="usersessiondata",
-            name="anonymous_user_id",
-            field=models.UUIDField(
-                db_index=True, help_text="UUID identifying the anonymous user/browser."
-            ),
-        ),
     ]
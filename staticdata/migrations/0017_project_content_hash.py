@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "staticdata",
+            "0016_rename_staticdata__anonymo_d7e79c_idx_staticdata__anonymo_5273f8_idx_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="content_hash",
+            field=models.CharField(
+                blank=True, db_index=True, default="", max_length=64
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:55
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Project = apps.get_model("staticdata", "Project")
+    ProjectLike = apps.get_model("staticdata", "ProjectLike")
+    ProjectComment = apps.get_model("staticdata", "ProjectComment")
+    likes = (
+        ProjectLike.objects.filter(project=OuterRef("pk"))
+        .order_by()
+        .values("project")
+        .annotate(c=Count("pk"))
+        .values("c")
+    )
+    comments = (
+        ProjectComment.objects.filter(project=OuterRef("pk"))
+        .order_by()
+        .values("project")
+        .annotate(c=Count("pk"))
+        .values("c")
+    )
+    Project.objects.update(
+        like_count=Coalesce(Subquery(likes), 0),
+        comment_count=Coalesce(Subquery(comments), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("staticdata", "0018_project_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="like_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_project_owner(apps, schema_editor):
+    Project = apps.get_model("staticdata", "Project")
+    UserNameDb = apps.get_model("staticdata", "UserNameDb")
+    usernames = Project.objects.values_list("username", flat=True).distinct()
+    # UserNameDb.username is not unique; like the old lookups, the first row wins.
+    owner_ids = {}
+    for user_id, username in (
+        UserNameDb.objects.filter(username__in=list(usernames))
+        .order_by("-pk")
+        .values_list("pk", "username")
+    ):
+        owner_ids[username] = user_id
+    for username, user_id in owner_ids.items():
+        Project.objects.filter(username=username).update(owner_id=user_id)
+
+
+def restore_project_username(apps, schema_editor):
+    Project = apps.get_model("staticdata", "Project")
+    for project in Project.objects.exclude(owner=None).select_related("owner"):
+        Project.objects.filter(pk=project.pk).update(username=project.owner.username)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("staticdata", "0019_project_like_count_project_comment_count"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="usernamedb",
+            name="username",
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="owner",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="staticdata.usernamedb",
+            ),
+        ),
+        migrations.RunPython(backfill_project_owner, restore_project_username),
+        migrations.RemoveField(
+            model_name="project",
+            name="username",
+        ),
+        migrations.RenameField(
+            model_name="project",
+            old_name="owner",
+            new_name="username",
+        ),
+        migrations.AlterField(
+            model_name="project",
+            name="username",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="projects",
+                to="staticdata.usernamedb",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("staticdata", "0020_project_username_foreign_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="artifact_stats",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
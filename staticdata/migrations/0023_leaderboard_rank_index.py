@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:06
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_entries(apps, schema_editor):
+    # get_or_create raced before the constraint existed; keep the newest entry per user.
+    # Scores are derived data, so rebuild_leaderboard corrects whatever the kept row holds.
+    Leaderboard = apps.get_model("staticdata", "Leaderboard")
+    keep_ids = (
+        Leaderboard.objects.order_by()
+        .values("user")
+        .annotate(keep_id=Max("id"))
+        .values_list("keep_id", flat=True)
+    )
+    Leaderboard.objects.exclude(id__in=list(keep_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("staticdata", "0022_uploadjob"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="leaderboard",
+            index=models.Index(
+                fields=["-score", "-id"], name="leaderboard_score_id_idx"
+            ),
+        ),
+        migrations.RunPython(remove_duplicate_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="leaderboard",
+            constraint=models.UniqueConstraint(
+                fields=("user",), name="unique_leaderboard_user"
+            ),
+        ),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("staticdata", "0023_leaderboard_rank_index"),
+    ]
+
+    operations = [
+        # Added without a default first so existing projects stay NULL instead of all
+        # looking like they were created at migration time.
+        migrations.AddField(
+            model_name="project",
+            name="created_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="project",
+            name="created_at",
+            field=models.DateTimeField(
+                blank=True, db_index=True, default=django.utils.timezone.now, null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="projectcomment",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name="projectlike",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name="LeaderboardSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "window",
+                    models.CharField(
+                        choices=[
+                            ("daily", "Daily"),
+                            ("weekly", "Weekly"),
+                            ("all_time", "All time"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("score", models.IntegerField(default=0)),
+                ("rank", models.PositiveIntegerField()),
+                ("computed_at", models.DateTimeField()),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leaderboard_snapshots",
+                        to="staticdata.usernamedb",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["window", "rank"], name="snapshot_window_rank_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("window", "user"), name="unique_snapshot_window_user"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ScoreDailyBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("score", models.IntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="score_buckets",
+                        to="staticdata.usernamedb",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "user"), name="unique_score_bucket_day_user"
+                    )
+                ],
+            },
+        ),
+    ]
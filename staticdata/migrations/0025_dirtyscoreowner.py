@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("staticdata", "0024_leaderboard_windows"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DirtyScoreOwner",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="dirty_score",
+                        serialize=False,
+                        to="staticdata.usernamedb",
+                    ),
+                ),
+                ("version", models.PositiveIntegerField(default=0)),
+                ("flushed_version", models.PositiveIntegerField(default=0)),
+                (
+                    "next_flush_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("last_flushed_at", models.DateTimeField(blank=True, null=True)),
+                ("locked_by", models.CharField(blank=True, default="", max_length=100)),
+                ("locked_until", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["next_flush_at"], name="dirty_score_next_flush_idx"
+                    )
+                ],
+            },
+        ),
+    ]
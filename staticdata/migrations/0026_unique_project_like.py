@@ -0,0 +1,52 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:09
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    # Concurrent toggles could insert the same like twice; keep the first of each pair and
+    # recount like_count for the affected projects. rebuild_leaderboard fixes owner scores.
+    Project = apps.get_model("staticdata", "Project")
+    ProjectLike = apps.get_model("staticdata", "ProjectLike")
+    duplicates = (
+        ProjectLike.objects.order_by()
+        .values("project", "username")
+        .annotate(keep_id=Min("id"), likes=Count("id"))
+        .filter(likes__gt=1)
+    )
+    affected_project_ids = set()
+    for duplicate in duplicates:
+        ProjectLike.objects.filter(
+            project=duplicate["project"], username=duplicate["username"]
+        ).exclude(id=duplicate["keep_id"]).delete()
+        affected_project_ids.add(duplicate["project"])
+    if affected_project_ids:
+        likes = (
+            ProjectLike.objects.filter(project=OuterRef("pk"))
+            .order_by()
+            .values("project")
+            .annotate(c=Count("pk"))
+            .values("c")
+        )
+        Project.objects.filter(pk__in=affected_project_ids).update(
+            like_count=Coalesce(Subquery(likes), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("staticdata", "0025_dirtyscoreowner"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="projectlike",
+            constraint=models.UniqueConstraint(
+                fields=("project", "username"), name="unique_project_like_user"
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("staticdata", "0026_unique_project_like"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="projectcomment",
+            index=models.Index(
+                fields=["project", "-created_at", "-id"],
+                name="comment_project_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("staticdata", "0027_comment_thread_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingLikeDelta",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("delta", models.SmallIntegerField()),
+                (
+                    "batch",
+                    models.CharField(
+                        blank=True, db_index=True, default="", max_length=32
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending_like_deltas",
+                        to="staticdata.project",
+                    ),
+                ),
+            ],
+        ),
+    ]
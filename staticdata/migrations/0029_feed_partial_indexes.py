@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("staticdata", "0028_pendinglikedelta"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                condition=models.Q(("username__isnull", False)),
+                fields=["tabname", "-id"],
+                name="feed_tab_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                condition=models.Q(("username__isnull", False)),
+                fields=["gradename", "-id"],
+                name="feed_grade_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                condition=models.Q(("username__isnull", False)),
+                fields=["subjectname", "-id"],
+                name="feed_subject_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("staticdata", "0029_feed_partial_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="uploadjob",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("queued", "Queued"),
+                    ("running", "Running"),
+                    ("succeeded", "Succeeded"),
+                    ("failed", "Failed"),
+                    ("superseded", "Superseded"),
+                ],
+                default="queued",
+                max_length=10,
+            ),
+        ),
+    ]
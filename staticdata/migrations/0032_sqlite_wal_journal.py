@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:40
+
+from django.db import migrations
+
+
+def enable_wal(apps, schema_editor):
+    # WAL is stored in the database file, so it is switched on once here rather than by every
+    # connection (which would rewrite the file header on each connect). Postgres has no such mode.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=WAL")
+
+
+def disable_wal(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=DELETE")
+
+
+class Migration(migrations.Migration):
+    # SQLite refuses to change the journal mode inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("staticdata", "0031_uploadjob_superseded"),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_wal, disable_wal),
+    ]
@@ -5,35 +5,60 @@ from django.contrib.auth.models import User
 from django.utils.timezone import now
 from django.conf import settings
 
-from datetime import timedelta
 class UserNameDb(models.Model):
-    username = models.CharField(max_length=100)
+    username = models.CharField(max_length=100, db_index=True)
     profile_picture = models.CharField(max_length=100)
     userid = models.CharField(max_length=100)
     role = models.CharField(max_length=100)
     email = models.CharField(max_length=100, unique=False,default='visora@gmail.com')
 
+    def __str__(self):
+        return self.username
+
 class Project(models.Model):
     id = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True, editable=False)  # Unique identifier
     name = models.CharField(max_length=255)
     description = models.TextField()
     token = models.CharField(max_length=100, unique=False,default='abcd')
-    username = models.CharField(max_length=100, unique=False,default='visora')
+    # Null only for legacy rows whose username had no UserNameDb entry when the FK was introduced.
+    username = models.ForeignKey(UserNameDb, on_delete=models.CASCADE, null=True, related_name="projects")
     email = models.CharField(max_length=100, unique=False,default='visora@gmail.com')
 
     tabname = models.CharField(max_length=100, unique=False,default='tab')
     gradename = models.CharField(max_length=100, unique=False,default='tab')
     subjectname = models.CharField(max_length=100, unique=False,default='tab')
 
+    # sha256 of the current combined.html blob in the artifact store (see staticdata.artifacts)
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    # Byte sizes of the current artifact: {"raw", "minified", "gzip", "br"}
+    artifact_stats = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Null for projects created before this column existed.
+    created_at = models.DateTimeField(default=now, null=True, blank=True, db_index=True)
+
+    # Denormalized counters, kept in step with F() updates by the like/comment views.
+    # reconcile_project_counters recounts them from ProjectLike/ProjectComment.
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
     def get_folder_name(self):
         sanitized_name = self.name.replace(" ", "_")
         return f"{sanitized_name}_{self.token[:7]}"
 
     def total_likes(self):
-        return self.likes.count()
+        return self.like_count
 
     def total_comments(self):
-        return self.comments.count()
+        return self.comment_count
+
+    class Meta:
+        # Partial indexes for the public feed (list_projects), which filters on one of these
+        # columns, skips projects without an owner and pages newest-first by pk.
+        indexes = [
+            models.Index(fields=['tabname', '-id'], condition=models.Q(username__isnull=False), name='feed_tab_idx'),
+            models.Index(fields=['gradename', '-id'], condition=models.Q(username__isnull=False), name='feed_grade_idx'),
+            models.Index(fields=['subjectname', '-id'], condition=models.Q(username__isnull=False), name='feed_subject_idx'),
+        ]
 
 class ProjectFile(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="files")
@@ -48,16 +73,81 @@ class ProjectComment(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="comments")
     username = models.ForeignKey(UserNameDb, on_delete=models.CASCADE, related_name="usernamecomment") 
     text = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True) 
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        # Serves a project's thread in (created_at, id) order for keyset pages and `since` polls.
+        indexes = [
+            models.Index(fields=['project', '-created_at', '-id'], name='comment_project_created_idx'),
+        ]
 
 class ProjectLike(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="likes")
     username = models.ForeignKey(UserNameDb, on_delete=models.CASCADE, related_name="usernamelike") 
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"{self.project.name} ({self.username})"
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'username'], name='unique_project_like_user'),
+        ]
+
+
+
+class PendingLikeDelta(models.Model):
+    """
+    A like (+1) or unlike (-1) not yet folded into Project.like_count and the owner's score.
+    Only written when LIKE_WRITE_BEHIND is on; flush_like_deltas applies them in batches.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="pending_like_deltas")
+    delta = models.SmallIntegerField()
+    # Set by the flusher that claimed the row; empty while waiting.
+    batch = models.CharField(max_length=32, blank=True, default='', db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class UploadJob(models.Model):
+    """
+    Deferred publish of an upload's html/css/js, processed by the process_upload_jobs command
+    (see staticdata.jobs). A running job whose lease expires is picked up again, so processing
+    is at-least-once and must stay idempotent. A newer upload of the same project supersedes
+    the jobs still pending for it.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    SUPERSEDED = "superseded"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"), (RUNNING, "Running"), (SUCCEEDED, "Succeeded"), (FAILED, "Failed"),
+        (SUPERSEDED, "Superseded"),
+    ]
+
+    id = models.UUIDField(default=uuid.uuid4, primary_key=True, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="upload_jobs")
+    # {"html_content", "css_content", "js_content"}; cleared once the job succeeds.
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    available_at = models.DateTimeField(default=now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Upload job {self.pk} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
 
 
 class Quiz(models.Model):
@@ -92,11 +182,76 @@ class Leaderboard(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.score}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user'], name='unique_leaderboard_user'),
+        ]
+        # Ranking order; id breaks ties so ranks and keyset pages are stable.
+        indexes = [
+            models.Index(fields=['-score', '-id'], name='leaderboard_score_id_idx'),
+        ]
     
-    def check_time_gap(self):
-        """Check if the last update was 24 hours ago or more."""
-        return now() - self.updated_at >= timedelta(seconds=5)
-    
+
+class DirtyScoreOwner(models.Model):
+    """
+    An owner whose score needs a from-scratch recompute, coalesced by the flush_dirty_scores
+    command. Every event bumps `version`; a flush records the version it started from, so
+    events that land mid-flush leave the row dirty and get a final flush of their own.
+    """
+    user = models.OneToOneField(UserNameDb, on_delete=models.CASCADE, primary_key=True, related_name="dirty_score")
+    version = models.PositiveIntegerField(default=0)
+    flushed_version = models.PositiveIntegerField(default=0)
+    next_flush_at = models.DateTimeField(default=now)
+    last_flushed_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.username} (v{self.version}, flushed v{self.flushed_version})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_flush_at'], name='dirty_score_next_flush_idx'),
+        ]
+
+
+class ScoreDailyBucket(models.Model):
+    """Points a project owner earned on one UTC day; maintained by rebuild_leaderboard_windows."""
+    user = models.ForeignKey(UserNameDb, on_delete=models.CASCADE, related_name="score_buckets")
+    day = models.DateField()
+    score = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'user'], name='unique_score_bucket_day_user'),
+        ]
+
+
+class LeaderboardSnapshot(models.Model):
+    """Precomputed, ranked leaderboard of one window, replaced as a whole on every rebuild."""
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    ALL_TIME = "all_time"
+    WINDOW_CHOICES = [(DAILY, "Daily"), (WEEKLY, "Weekly"), (ALL_TIME, "All time")]
+
+    window = models.CharField(max_length=10, choices=WINDOW_CHOICES)
+    user = models.ForeignKey(UserNameDb, on_delete=models.CASCADE, related_name="leaderboard_snapshots")
+    score = models.IntegerField(default=0)
+    rank = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.window} #{self.rank} {self.user.username} - {self.score}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['window', 'user'], name='unique_snapshot_window_user'),
+        ]
+        indexes = [
+            models.Index(fields=['window', 'rank'], name='snapshot_window_rank_idx'),
+        ]
+
 
 class Category(models.Model):
     name = models.CharField(max_length=255, unique=False)
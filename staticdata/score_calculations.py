@@ -1,37 +1,184 @@
-from datetime import timedelta
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
 from django.utils.timezone import now
-from staticdata.models import Project, Leaderboard, UserNameDb
+from staticdata.models import (
+    Project, ProjectLike, ProjectComment, Leaderboard, ScoreDailyBucket, LeaderboardSnapshot,
+    DirtyScoreOwner
+)
+
+# A project owner's leaderboard score is, over all of their projects:
+# LIKE_POINTS per like + COMMENT_POINTS per comment + PROJECT_POINTS per project.
+LIKE_POINTS = 5
+COMMENT_POINTS = 7
+PROJECT_POINTS = 10
+
+PROJECT_SCORE = F("like_count") * LIKE_POINTS + F("comment_count") * COMMENT_POINTS + PROJECT_POINTS
+
 
-def likeScoreCalculation(user_name):
+def project_score(like_count, comment_count):
+    """What a single project contributes to its owner's score."""
+    return like_count * LIKE_POINTS + comment_count * COMMENT_POINTS + PROJECT_POINTS
+
+
+def apply_score_delta(user_instance, delta):
     """
-    Function to calculate and update the leaderboard score.
-    - 5 points for liking a project
-    - 7 points for commenting on a project
-    - 10 point per project
+    Adds delta to the owner's leaderboard score with one F() UPDATE. Call it inside the
+    transaction that records the event, so the score commits or rolls back with it.
     """
-    # Fetch or create leaderboard entry
-    user_instance = UserNameDb.objects.get(username=user_name)
-    leaderboard_entry, _ = Leaderboard.objects.get_or_create(user=user_instance)
+    if user_instance is None or not delta:
+        return
+    updated = Leaderboard.objects.filter(user=user_instance).update(score=F("score") + delta, updated_at=now())
+    if not updated:
+        # No entry yet: derive it from scratch, which already counts this event.
+        likeScoreCalculation(user_instance)
+    mark_score_dirty(user_instance)
+
+
+def mark_score_dirty(user_instance):
+    """Queues a coalesced from-scratch recompute of the owner's score (see flush_dirty_scores)."""
+    if not DirtyScoreOwner.objects.filter(user=user_instance).update(version=F("version") + 1):
+        entry, created = DirtyScoreOwner.objects.get_or_create(user=user_instance, defaults={"version": 1})
+        if not created:
+            DirtyScoreOwner.objects.filter(user=user_instance).update(version=F("version") + 1)
 
-    # Check if it's time to recalculate the score
-    if leaderboard_entry.check_time_gap():
-        projects = Project.objects.filter(username=user_name)
 
-        # Initialize score variables
-        like_score = 0
-        comment_score = 0
-        project_score = 0
+def _flushable(current_time):
+    return (
+        Q(version__gt=F("flushed_version"), next_flush_at__lte=current_time)
+        & (Q(locked_until__isnull=True) | Q(locked_until__lt=current_time))
+    )
 
-        for prj in projects:
-            like_score += prj.total_likes() * 5
-            comment_score += prj.total_comments() * 7
-            project_score += 10  # Each project contributes 1 point
 
-        # Calculate total score
-        total_score = like_score + comment_score + project_score
+def claim_dirty_owners(worker_id, lease_seconds, limit):
+    """
+    Leases up to `limit` dirty owners that are due. Each claim is a conditional UPDATE on the
+    row, so concurrent flushers never recompute the same owner at the same time.
+    """
+    current_time = now()
+    candidates = (
+        DirtyScoreOwner.objects.filter(_flushable(current_time))
+        .order_by("next_flush_at")
+        .values_list("pk", flat=True)[:limit]
+    )
+    claimed = []
+    for user_id in candidates:
+        if DirtyScoreOwner.objects.filter(_flushable(current_time), pk=user_id).update(
+            locked_by=worker_id, locked_until=current_time + timedelta(seconds=lease_seconds)
+        ):
+            claimed.append(user_id)
+    return claimed
+
+
+def flush_dirty_owner(user_id, worker_id, interval_seconds):
+    """
+    Recomputes one claimed owner and holds off the next flush for interval_seconds. Returns
+    False when the lease was lost to another flusher, which then owns the row.
+    """
+    entry = DirtyScoreOwner.objects.select_related("user").get(pk=user_id)
+    # Read before recomputing: an event landing mid-flush bumps version past this one, so the
+    # row stays dirty and that event is covered by the next (final) flush.
+    seen_version = entry.version
+    likeScoreCalculation(entry.user)
+    flushed_at = now()
+    return bool(DirtyScoreOwner.objects.filter(pk=user_id, locked_by=worker_id).update(
+        flushed_version=seen_version,
+        last_flushed_at=flushed_at,
+        next_flush_at=flushed_at + timedelta(seconds=interval_seconds),
+        locked_by='',
+        locked_until=None,
+    ))
+
 
-        # Update the leaderboard score
-        leaderboard_entry.score = total_score
-        leaderboard_entry.save()
+def likeScoreCalculation(user_instance):
+    """
+    Recomputes the leaderboard score of a project owner (UserNameDb) from scratch in one
+    aggregate query over the Project counters. Events use apply_score_delta; this is for
+    owners without an entry yet and for repairs (see the rebuild_leaderboard command).
+    """
+    if user_instance is None:
+        return None
+
+    total_score = Project.objects.filter(username=user_instance).aggregate(
+        score=Coalesce(Sum(PROJECT_SCORE, output_field=IntegerField()), 0)
+    )["score"]
+    if not Leaderboard.objects.filter(user=user_instance).update(score=total_score, updated_at=now()):
+        # get_or_create absorbs a concurrent insert hitting unique_leaderboard_user.
+        Leaderboard.objects.get_or_create(user=user_instance, defaults={"score": total_score})
+    return total_score
+
+
+# Rolling windows in UTC days, today included. The all-time window is the Leaderboard itself.
+WINDOW_DAYS = {LeaderboardSnapshot.DAILY: 1, LeaderboardSnapshot.WEEKLY: 7}
+
+
+def rebuild_score_buckets(first_day):
+    """
+    Recomputes the ScoreDailyBucket rows from first_day up to today with one GROUP BY per
+    event table, each a range scan on its created_at index. Older buckets are left alone.
+    Returns the number of buckets written.
+    """
+    start = datetime.combine(first_day, time.min, tzinfo=dt_timezone.utc)
+    sources = [
+        (ProjectLike.objects.filter(created_at__gte=start), "project__username", LIKE_POINTS),
+        (ProjectComment.objects.filter(created_at__gte=start), "project__username", COMMENT_POINTS),
+        (Project.objects.filter(created_at__gte=start), "username", PROJECT_POINTS),
+    ]
+    totals = Counter()
+    for queryset, owner_field, points in sources:
+        rows = (
+            queryset.filter(**{f"{owner_field}__isnull": False})
+            .order_by()
+            .annotate(day=TruncDate("created_at", tzinfo=dt_timezone.utc))
+            .values(owner_field, "day")
+            .annotate(events=Count("pk"))
+            .values_list(owner_field, "day", "events")
+        )
+        for user_id, day, events in rows:
+            totals[(user_id, day)] += events * points
+
+    with transaction.atomic():
+        ScoreDailyBucket.objects.filter(day__gte=first_day).delete()
+        ScoreDailyBucket.objects.bulk_create(
+            [ScoreDailyBucket(user_id=user_id, day=day, score=score) for (user_id, day), score in totals.items()],
+            batch_size=500,
+        )
+    return len(totals)
+
+
+def rebuild_leaderboard_snapshots(today):
+    """
+    Replaces every LeaderboardSnapshot window with freshly ranked rows. Rolling windows are
+    summed from ScoreDailyBucket and all-time is copied from Leaderboard, so the event tables
+    are never read here. Returns {window: number of ranked users}.
+    """
+    window_scores = {
+        window: list(
+            ScoreDailyBucket.objects.filter(day__gt=today - timedelta(days=days))
+            .order_by()
+            .values("user")
+            .annotate(total=Sum("score"))
+            .order_by("-total", "-user")
+            .values_list("user", "total")
+        )
+        for window, days in WINDOW_DAYS.items()
+    }
+    window_scores[LeaderboardSnapshot.ALL_TIME] = list(
+        Leaderboard.objects.order_by("-score", "-id").values_list("user", "score")
+    )
 
-        print(f"The total score of user {user_name} is: {total_score}")
+    computed_at = now()
+    with transaction.atomic():
+        for window, rows in window_scores.items():
+            LeaderboardSnapshot.objects.filter(window=window).delete()
+            LeaderboardSnapshot.objects.bulk_create(
+                [
+                    LeaderboardSnapshot(window=window, user_id=user_id, score=score, rank=rank, computed_at=computed_at)
+                    for rank, (user_id, score) in enumerate(rows, start=1)
+                ],
+                batch_size=500,
+            )
+    return {window: len(rows) for window, rows in window_scores.items()}
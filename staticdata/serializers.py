@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Project, ProjectFile,ProjectLike,ProjectComment,Quiz,Leaderboard,Theory,Examples,Category,UserSessionData
+from .models import Project, ProjectFile,ProjectLike,ProjectComment,Quiz,Leaderboard,Theory,Examples,Category,UserSessionData,UploadJob,LeaderboardSnapshot
 
 class ProjectFileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,12 +8,19 @@ class ProjectFileSerializer(serializers.ModelSerializer):
 
 class ProjectSerializer(serializers.ModelSerializer):
     files = ProjectFileSerializer(many=True, read_only=True)
-    total_likes = serializers.ReadOnlyField()
-    total_comments = serializers.ReadOnlyField()
+    total_likes = serializers.IntegerField(source='like_count', read_only=True)
+    total_comments = serializers.IntegerField(source='comment_count', read_only=True)
     
     class Meta:
         model = Project
-        fields = ['id', 'name', 'description', 'token', 'files','total_likes','total_comments']
+        fields = ['id', 'name', 'description', 'token', 'files','total_likes','total_comments','artifact_stats']
+
+
+class UploadJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadJob
+        fields = ['id', 'project', 'status', 'progress', 'attempts', 'max_attempts', 'last_error',
+                  'created_at', 'updated_at', 'finished_at']
 
 
 class ProjectCommentSerializer(serializers.ModelSerializer):
@@ -56,6 +63,16 @@ class ScoreSerializer(serializers.ModelSerializer):
         fields = ['id', 'username','userpic','userid', 'score', 'updated_at']
 
 
+class LeaderboardSnapshotSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source="user.username")
+    userpic = serializers.CharField(source="user.profile_picture")
+    userid = serializers.IntegerField(source="user.userid")
+
+    class Meta:
+        model = LeaderboardSnapshot
+        fields = ['rank', 'username', 'userpic', 'userid', 'score', 'computed_at']
+
+
 class CategorySerializer(serializers.ModelSerializer):
     children = serializers.SerializerMethodField()
 
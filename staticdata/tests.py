@@ -1,3 +1,306 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import time
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+
+from staticdata.artifacts import (
+    build_combined_html, get_artifact_full_path, minify_combined_html, minify_css, minify_html, publish_artifact,
+    read_combined_html, set_project_artifact
+)
+from staticdata.jobs import claim_next_job, enqueue_upload, publish_project_upload, run_job
+from staticdata.models import (
+    Category, Examples, LeaderboardSnapshot, Project, ProjectComment, ProjectLike,
+    Quiz, Theory, UploadJob, UserNameDb
+)
+from staticdata.score_calculations import likeScoreCalculation, rebuild_leaderboard_snapshots, rebuild_score_buckets
+
+# Seeded data sizes: every route must run the same number of queries at each of them.
+SIZES = (2, 5, 12)
+
+# (label, url(fixture), extra request headers, query budget). The budget is an upper bound on the
+# queries one request may run; it must also be the same at every size in SIZES.
+ROUTE_BUDGETS = [
+    ("list_projects full", lambda f: reverse("staticdata:list_projects"), {}, 1),
+    ("list_projects full paged", lambda f: reverse("staticdata:list_projects") + "?page_size=5", {}, 1),
+    ("list_projects summary", lambda f: reverse("staticdata:list_projects") + "?mode=summary", {}, 1),
+    ("list_projects filtered", lambda f: reverse("staticdata:list_projects") + "?selectedTab=tab&mode=summary", {}, 1),
+    ("list_projects own", lambda f: reverse("staticdata:list_projects") + "?mode=summary", "auth", 2),
+    ("list_project_names_ids", lambda f: reverse("staticdata:list_project_names_ids"), "auth", 2),
+    ("projects_social_state", lambda f: reverse("staticdata:projects_social_state") + f"?ids={f['project_ids']}", "auth", 2),
+    ("get_project", lambda f: reverse("staticdata:get_project_detail", args=[f["project"].pk]), {}, 2),
+    ("project_detail_generic", lambda f: reverse("staticdata:project_detail_generic", args=[f["project"].pk]), {}, 2),
+    ("project_search", lambda f: reverse("staticdata:project_search") + "?query=Project", {}, 3),
+    ("comments", lambda f: reverse("staticdata:project_comments", args=[f["project"].pk]), {}, 2),
+    ("comments paged", lambda f: reverse("staticdata:project_comments", args=[f["project"].pk]) + "?page_size=5", {}, 2),
+    ("like state", lambda f: reverse("staticdata:project_like_toggle", args=[f["project"].pk]), "auth", 3),
+    ("scores", lambda f: reverse("staticdata:leaderboard-list"), {}, 2),
+    ("scores keyset", lambda f: reverse("staticdata:leaderboard-list") + "?cursor=", {}, 1),
+    ("scores rank", lambda f: reverse("staticdata:leaderboard-rank"), "auth", 2),
+    ("scores around", lambda f: reverse("staticdata:leaderboard-around") + "?k=3", "auth", 4),
+    ("leaderboard weekly", lambda f: reverse("staticdata:leaderboard_snapshot", args=["weekly"]), {}, 2),
+    ("categories", lambda f: reverse("staticdata:category_list"), {}, 1),
+    ("materials", lambda f: reverse("staticdata:project_materials", args=[f["project"].pk]) + "?type=quizzes", {}, 1),
+    ("quizzes", lambda f: reverse("staticdata:project-quiz-list", args=[f["project"].pk]), {}, 1),
+    ("theories", lambda f: reverse("staticdata:project-theory-list", args=[f["project"].pk]), {}, 1),
+]
+
+
+def seed(size):
+    """`size` users, each owning a project that every user liked and commented on, plus a category tree."""
+    users = [
+        UserNameDb.objects.create(
+            username=f"user{i}", email=f"user{i}@example.com", profile_picture="pic", userid=str(i), role="student"
+        )
+        for i in range(size)
+    ]
+    projects = []
+    for i, user in enumerate(users):
+        project = Project.objects.create(
+            name=f"Project {i}", username=user, description="Seeded", token="tok",
+            tabname="tab", gradename="grade", subjectname="subject",
+        )
+        set_project_artifact(project, f"<html><body>Project {i}</body></html>")
+        projects.append(project)
+    for project in projects:
+        for user in users:
+            ProjectLike.objects.create(project=project, username=user)
+            ProjectComment.objects.create(project=project, username=user, text=f"Comment by {user.username}")
+        Project.objects.filter(pk=project.pk).update(like_count=size, comment_count=size)
+        Quiz.objects.bulk_create([Quiz(project=project, data={"q": i}) for i in range(size)])
+        Theory.objects.bulk_create([Theory(project=project, data={"t": i}) for i in range(size)])
+        Examples.objects.bulk_create([Examples(project=project, data={"e": i}) for i in range(size)])
+    for user in users:
+        likeScoreCalculation(user)
+    rebuild_score_buckets(now().date())
+    rebuild_leaderboard_snapshots(now().date())
+
+    for i in range(size):
+        grade = Category.objects.create(name=f"Grade {i}")
+        for j in range(size):
+            subject = Category.objects.create(name=f"Subject {j}", parent=grade)
+            for k in range(size):
+                Category.objects.create(name=f"Topic {k}", parent=subject, category_name=f"topic-{k}")
+
+    return {
+        "user": users[0],
+        "project": projects[0],
+        "project_ids": ",".join(str(project.pk) for project in projects),
+    }
+
+
+def clear():
+    Category.objects.all().delete()
+    LeaderboardSnapshot.objects.all().delete()
+    Project.objects.all().delete()
+    UserNameDb.objects.all().delete()
+
+
+class TempMediaRootMixin:
+    """Points MEDIA_ROOT at a fresh temporary folder for the test class and removes it afterwards."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+
+
+@override_settings(VISORA_USER_CACHE_TTL=0)
+class QueryBudgetTests(TempMediaRootMixin, TestCase):
+    """
+    Guards the read endpoints against N+1 queries: each route is called against several
+    seeded sizes and must stay within its budget with a query count that does not grow.
+    """
+
+    def count_queries(self, url, headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        self.assertLess(response.status_code, 400, f"{url} answered {response.status_code}")
+        return len(queries)
+
+    def test_query_budgets(self):
+        counts = {label: [] for label, _, _, _ in ROUTE_BUDGETS}
+        for size in SIZES:
+            clear()
+            fixture = seed(size)
+            for label, url, headers, _ in ROUTE_BUDGETS:
+                if headers == "auth":
+                    headers = {"Authorization": fixture["user"].username}
+                counts[label].append(self.count_queries(url(fixture), headers))
+
+        for label, _, _, budget in ROUTE_BUDGETS:
+            with self.subTest(route=label):
+                self.assertEqual(len(set(counts[label])), 1, f"{label}: queries grow with data size {dict(zip(SIZES, counts[label]))}")
+                self.assertLessEqual(max(counts[label]), budget, f"{label}: over its budget of {budget} queries")
+
+
+def create_author():
+    return UserNameDb.objects.create(username="author", email="a@example.com", profile_picture="", userid="1", role="student")
+
+
+@override_settings(VISORA_USER_CACHE_TTL=0)
+class ProjectPreviewTests(TempMediaRootMixin, TestCase):
+    """Uploaded HTML is served sandboxed on every kind of preview response."""
+
+    def setUp(self):
+        self.project = Project.objects.create(name="Preview", username=create_author(), token="tok")
+        set_project_artifact(self.project, "<html><body><script>document.cookie</script></body></html>" * 50)
+        self.url = reverse("staticdata:project_preview", args=[self.project.pk])
+
+    def assertSandboxed(self, response, status_code):
+        self.assertEqual(response.status_code, status_code)
+        self.assertEqual(response["Content-Security-Policy"], "sandbox allow-scripts")
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+
+    def test_preview_sends_minified_variant_and_api_keeps_original(self):
+        original = build_combined_html("Preview", "<p>\n    spaced   out\n</p>", "p  {  margin: 0;  }", "")
+        set_project_artifact(self.project, original)
+        self.assertEqual(read_combined_html(self.project), original)
+        response = self.client.get(reverse("staticdata:get_project_detail", args=[self.project.pk]))
+        self.assertEqual(response.json()["combined_html"], original)
+        preview = b"".join(self.client.get(self.url).streaming_content).decode()
+        self.assertEqual(preview, minify_combined_html(original))
+        stats = Project.objects.get(pk=self.project.pk).artifact_stats
+        self.assertEqual(stats["raw"], len(original.encode()))
+        self.assertEqual(stats["minified"], len(preview.encode()))
+
+    def test_preview_responses_are_sandboxed(self):
+        response = self.client.get(self.url)
+        self.assertSandboxed(response, 200)
+        etag = response["ETag"]
+        self.assertSandboxed(self.client.get(self.url, headers={"Range": "bytes=0-9"}), 206)
+        self.assertSandboxed(self.client.get(self.url, headers={"If-None-Match": etag}), 304)
+        compressed = self.client.get(self.url, headers={"Accept-Encoding": "gzip"})
+        self.assertSandboxed(compressed, 200)
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+
+
+class UploadJobOrderTests(TempMediaRootMixin, TestCase):
+    """The newest upload of a project wins, whatever order its jobs finish in."""
+
+    def setUp(self):
+        self.project = Project.objects.create(name="Ordered", username=create_author(), token="tok")
+
+    def enqueue(self, text):
+        return enqueue_upload(self.project, f"<p>{text}</p>", "", "")
+
+    def published_text(self):
+        return read_combined_html(Project.objects.get(pk=self.project.pk))
+
+    def test_enqueue_supersedes_pending_jobs(self):
+        older = self.enqueue("older")
+        newer = self.enqueue("newer")
+        older.refresh_from_db()
+        self.assertEqual(older.status, UploadJob.SUPERSEDED)
+        self.assertEqual(older.payload, {})
+        job = claim_next_job("worker", 60)
+        self.assertEqual(job.pk, newer.pk)
+        self.assertTrue(run_job(job, "worker", 60))
+        self.assertIsNone(claim_next_job("worker", 60))
+        self.assertIn("<p>newer</p>", self.published_text())
+
+    def test_older_job_finishing_last_does_not_overwrite_newer_upload(self):
+        self.enqueue("older")
+        older = claim_next_job("worker-1", 60)
+        self.enqueue("newer")
+        newer = claim_next_job("worker-2", 60)
+        self.assertTrue(run_job(newer, "worker-2", 60))
+        self.assertTrue(run_job(older, "worker-1", 60))
+        self.assertIn("<p>newer</p>", self.published_text())
+        self.assertEqual(UploadJob.objects.get(pk=older.pk).status, UploadJob.SUPERSEDED)
+        self.assertEqual(UploadJob.objects.get(pk=newer.pk).status, UploadJob.SUCCEEDED)
+
+    def test_stale_job_is_skipped_even_when_still_marked_running(self):
+        self.enqueue("older")
+        older = claim_next_job("worker-1", 60)
+        # As if the older job had been reclaimed after the newer one was enqueued.
+        newer = self.enqueue("newer")
+        UploadJob.objects.filter(pk=older.pk).update(status=UploadJob.RUNNING, locked_by="worker-1")
+        self.assertTrue(run_job(older, "worker-1", 60))
+        self.assertEqual(UploadJob.objects.get(pk=older.pk).status, UploadJob.SUPERSEDED)
+        self.assertEqual(self.published_text(), "")
+        self.assertTrue(run_job(claim_next_job("worker-2", 60), "worker-2", 60))
+        self.assertEqual(UploadJob.objects.get(pk=newer.pk).status, UploadJob.SUCCEEDED)
+
+    @override_settings(VISORA_USER_CACHE_TTL=0)
+    def test_code_update_supersedes_queued_jobs(self):
+        queued = self.enqueue("queued")
+        response = self.client.put(
+            reverse("staticdata:update_project_code", args=[self.project.pk]),
+            {"html_content": "<p>edited</p>"}, content_type="application/json", headers={"Authorization": "author"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("<p>edited</p>", response.json()["combined_html"])
+        self.assertEqual(UploadJob.objects.get(pk=queued.pk).status, UploadJob.SUPERSEDED)
+        self.assertIsNone(claim_next_job("worker", 60))
+        self.assertIn("<p>edited</p>", self.published_text())
+
+    def test_inline_upload_supersedes_queued_jobs(self):
+        queued = self.enqueue("queued")
+        self.assertTrue(publish_project_upload(self.project, "<p>inline</p>", "", ""))
+        self.assertEqual(UploadJob.objects.get(pk=queued.pk).status, UploadJob.SUPERSEDED)
+        self.assertIsNone(claim_next_job("worker", 60))
+        self.assertIn("<p>inline</p>", self.published_text())
+
+
+class MinifierTests(SimpleTestCase):
+    """Minification may only drop bytes that do not change what the page renders or runs."""
+
+    def test_html_collapses_text_whitespace(self):
+        self.assertEqual(minify_html("  <p>a  \n\n b</p>\n\n<p>c</p>  "), "<p>a b</p> <p>c</p>")
+
+    def test_html_drops_comments_but_keeps_conditional_ones(self):
+        self.assertEqual(minify_html("<p>a</p><!-- note --><!--[if IE]>x<![endif]-->"), "<p>a</p><!--[if IE]>x<![endif]-->")
+
+    def test_html_keeps_attribute_values(self):
+        html = '<p title="x\n\ny" data-rule="a > b">t</p>'
+        self.assertEqual(minify_html(html), html)
+
+    def test_html_keeps_verbatim_blocks(self):
+        html = "<pre>  a\n\n b</pre><textarea> x  y </textarea><script>let s = `a  \n\n  b`;</script>"
+        self.assertEqual(minify_html(html), html)
+
+    def test_css_keeps_strings(self):
+        self.assertEqual(minify_css('a  >  b { content: "x  ;  y" ; /* c */ color: red ; }'), 'a>b{content:"x  ;  y";color:red}')
+
+    def test_combined_html_minifies_css_and_keeps_js(self):
+        js = "const s = `a  \n\n  b`;   \n\n\nconsole.log(s);\n"
+        minified = minify_combined_html(build_combined_html("t", "<p>x  </p>\n\n", "p  {  color: red;  }", js))
+        self.assertIn("<style>p{color:red}</style>", minified)
+        self.assertIn("<p>x </p>", minified)
+        self.assertIn(js, minified)
+
+
+class PruneArtifactsTests(TempMediaRootMixin, TestCase):
+    """prune_artifacts removes old unreferenced blobs, but never one that is being reused."""
+
+    def publish_aged(self, content):
+        content_hash = publish_artifact(content)
+        folder = os.path.dirname(get_artifact_full_path(content_hash))
+        two_hours_ago = time.time() - 7200
+        os.utime(folder, (two_hours_ago, two_hours_ago))
+        return content_hash
+
+    def prune(self):
+        call_command("prune_artifacts", "--grace-seconds", "3600", stdout=io.StringIO())
+
+    def test_old_unreferenced_blob_is_removed(self):
+        content_hash = self.publish_aged("<p>orphan</p>")
+        self.prune()
+        self.assertFalse(os.path.exists(get_artifact_full_path(content_hash)))
+
+    def test_republished_blob_survives_until_it_is_referenced(self):
+        content_hash = self.publish_aged("<p>reused</p>")
+        # The dedup path of a new upload, before the project points at the blob.
+        self.assertEqual(publish_artifact("<p>reused</p>"), content_hash)
+        self.prune()
+        self.assertTrue(os.path.exists(get_artifact_full_path(content_hash)))
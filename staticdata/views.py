@@ -1,34 +1,55 @@
 import os
 import uuid
-from django.db import models
-from django.http import JsonResponse, HttpResponse
+import io
+import hmac
+import base64
+from django.db import models, transaction
+from django.http import JsonResponse, HttpResponse, FileResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.conf import settings
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.clickjacking import xframe_options_exempt
+from django.views.decorators.http import require_safe
 from django.utils.decorators import method_decorator
+from django.utils.cache import patch_vary_headers
 import json
 import logging
-import shutil
+from functools import wraps
+from datetime import datetime, timezone as dt_timezone
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics, permissions, viewsets, pagination, filters
 from rest_framework.decorators import api_view, action
 from rest_framework.exceptions import NotFound, PermissionDenied
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.utils.urls import replace_query_param
 from django.core.files.base import ContentFile
-from django.db.models import Q
+from django.db.models import Q, F
+from django.utils.timezone import now
 
 from .models import (
-    Project, ProjectFile, ProjectComment, ProjectLike, UserNameDb, Quiz, Theory,
-    Examples, Leaderboard, Category, UserSessionData
+    Project, ProjectComment, ProjectLike, UserNameDb, Quiz, Theory,
+    Examples, Leaderboard, Category, UserSessionData, UploadJob, LeaderboardSnapshot
 )
 from .serializers import (
     ProjectCommentSerializer, ProjectLikeSerializer, ProjectSerializer,
     QuizSerializer, TheorySerializer, ExamplesSerializer, ScoreSerializer,
-    CategorySerializer, UserSessionDataSerializer
+    CategorySerializer, UserSessionDataSerializer, UploadJobSerializer, LeaderboardSnapshotSerializer
 )
-from staticdata.score_calculations import likeScoreCalculation
+from staticdata.score_calculations import (
+    apply_score_delta, project_score, LIKE_POINTS, COMMENT_POINTS, PROJECT_POINTS
+)
+from staticdata.artifacts import (
+    read_combined_html, get_served_relative_path, get_compressed_variant_path, delete_legacy_project_folder
+)
+from staticdata.conditional import make_etag, project_etag, conditional_response, add_validators
+from staticdata.bulk_import import BulkImportError, parse_import, import_projects
+from staticdata.jobs import enqueue_upload, publish_project_upload
+from staticdata.like_buffer import buffer_like_delta, buffered_like_count
+from staticdata.identity import get_visora_user, invalidate_visora_user
 
 logger = logging.getLogger(__name__)
 
@@ -37,11 +58,34 @@ def get_username_from_auth_header(request):
     if not auth_header:
         logger.warning("Authorization header missing")
         return None
-    if not UserNameDb.objects.filter(username=auth_header).exists():
+    if not get_visora_user(request):
         logger.warning(f"Username '{auth_header}' from Authorization header not found in UserNameDb.")
         return None
     return auth_header
 
+def has_backend_secret(request):
+    """True when X-Visora-Backend-Key matches VISIORA_BACKEND_SECRET_KEY; always False if that is unset."""
+    expected = settings.VISIORA_BACKEND_SECRET_KEY
+    provided = request.headers.get("X-Visora-Backend-Key", "")
+    return bool(expected) and hmac.compare_digest(provided.encode(), expected.encode())
+
+def wants_async_upload(request):
+    """Uploads are queued when ASYNC_UPLOADS is on or the client sends `Prefer: respond-async`."""
+    return settings.ASYNC_UPLOADS or "respond-async" in request.headers.get("Prefer", "").lower()
+
+def upload_job_accepted(request, job):
+    status_url = request.build_absolute_uri(reverse('staticdata:upload_job_status', args=[job.id]))
+    response = Response({
+        "job_id": str(job.id), "project_id": str(job.project_id), "status": job.status, "status_url": status_url
+    }, status=status.HTTP_202_ACCEPTED)
+    response["Location"] = status_url
+    response["Preference-Applied"] = "respond-async"
+    return response
+
+# Columns an upload edits. The counters move by F() increments and the artifact columns are
+# written by set_project_artifact, so saving a Project loaded earlier must leave them alone.
+UPLOAD_METADATA_FIELDS = ["name", "description", "token", "email", "tabname", "gradename", "subjectname", "updated_at"]
+
 class UploadProjectAPIView(APIView):
     def post(self, request):
         username = get_username_from_auth_header(request)
@@ -65,7 +109,7 @@ class UploadProjectAPIView(APIView):
         if not name:
             return Response({"error": "Project name is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user_obj = UserNameDb.objects.get(username=username)
+        user_obj = get_visora_user(request)
         if not email and user_obj:
             email = user_obj.email
 
@@ -75,7 +119,7 @@ class UploadProjectAPIView(APIView):
 
         if project_id:
             try:
-                project = Project.objects.get(id=project_id, username=username)
+                project = Project.objects.get(id=project_id, username=user_obj)
                 project.name = name
                 project.description = description
                 project.token = token
@@ -83,17 +127,20 @@ class UploadProjectAPIView(APIView):
                 project.tabname = tabname
                 project.gradename = gradename
                 project.subjectname = subjectname
-                project.save()
+                project.save(update_fields=UPLOAD_METADATA_FIELDS)
             except Project.DoesNotExist:
                 return Response({"error": "Project with specified ID not found or access denied."}, status=status.HTTP_404_NOT_FOUND)
         else:
-            project, created = Project.objects.get_or_create(
-                name=name, username=username,
-                defaults={
-                    'description': description, 'token': token, 'email': email,
-                    'tabname': tabname, 'gradename': gradename, 'subjectname': subjectname
-                }
-            )
+            with transaction.atomic():
+                project, created = Project.objects.get_or_create(
+                    name=name, username=user_obj,
+                    defaults={
+                        'description': description, 'token': token, 'email': email,
+                        'tabname': tabname, 'gradename': gradename, 'subjectname': subjectname
+                    }
+                )
+                if created:
+                    apply_score_delta(user_obj, PROJECT_POINTS)
             if not created:
                 project.description = description
                 project.token = token
@@ -101,7 +148,7 @@ class UploadProjectAPIView(APIView):
                 project.tabname = tabname
                 project.gradename = gradename
                 project.subjectname = subjectname
-                project.save()
+                project.save(update_fields=UPLOAD_METADATA_FIELDS)
 
         if files:
             for file_obj in files:
@@ -110,37 +157,110 @@ class UploadProjectAPIView(APIView):
                 elif ext == ".css": css_content = file_obj.read().decode("utf-8", errors='ignore')
                 elif ext == ".js": js_content = file_obj.read().decode("utf-8", errors='ignore')
         
-        combined_html = f"""<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0"><title>{project.name}</title><style>{css_content}</style></head><body>{html_content}<script type="module">{js_content}</script></body></html>"""
-        
-        project_folder_path = os.path.join(settings.MEDIA_ROOT, "projects", project.get_folder_name())
-        os.makedirs(project_folder_path, exist_ok=True)
-        
-        combined_file_name = "combined.html"
-        combined_file_server_path = os.path.join(project_folder_path, combined_file_name)
-
-        with open(combined_file_server_path, "w", encoding="utf-8") as f:
-            f.write(combined_html)
-
-        relative_path_for_db = os.path.join("projects", project.get_folder_name(), combined_file_name)
-        
-        ProjectFile.objects.update_or_create(
-            project=project, file__endswith=combined_file_name,
-            defaults={'file': relative_path_for_db}
-        )
-        
-        try: likeScoreCalculation(project.username)
-        except Exception as e: logger.error(f"Error in likeScoreCalculation for {project.username}: {e}")
+        if wants_async_upload(request):
+            return upload_job_accepted(request, enqueue_upload(project, html_content, css_content, js_content))
+        publish_project_upload(project, html_content, css_content, js_content)
 
         serializer = ProjectSerializer(project)
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
+@api_view(['GET'])
+def upload_job_status(request, id):
+    job = get_object_or_404(UploadJob, id=id)
+    return Response(UploadJobSerializer(job).data)
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Keyset pagination over a descending (key, id) ordering backed by an index: every page is a
+    range scan starting after the last row of the previous one, so page 1000 costs the same as
+    page 1. The cursor is the (key, id) of that row; subclasses set `key_field`.
+    """
+    key_field = None
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            return min(max(int(request.query_params[self.page_size_query_param]), 1), self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def encode_position(self, obj):
+        raw = f"{getattr(obj, self.key_field)}|{obj.pk}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def decode_position(self, encoded, model):
+        try:
+            key, object_id = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8').rsplit('|', 1)
+            key = model._meta.get_field(self.key_field).to_python(key)
+            object_id = model._meta.pk.to_python(object_id)
+        except (ValueError, UnicodeError, DjangoValidationError):
+            raise NotFound('Invalid cursor')
+        if key is None:
+            raise NotFound('Invalid cursor')
+        return key, object_id
+
+    def before(self, queryset, position):
+        """Rows after `position` in descending order, newest/highest first."""
+        key, object_id = position
+        return queryset.filter(Q(**{f'{self.key_field}__lt': key}) | Q(**{self.key_field: key, 'pk__lt': object_id}))
+
+    def after(self, queryset, position):
+        """Rows past `position` in ascending order, i.e. newer/higher than it."""
+        key, object_id = position
+        return queryset.filter(Q(**{f'{self.key_field}__gt': key}) | Q(**{self.key_field: key, 'pk__gt': object_id}))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(f'-{self.key_field}', '-pk')
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            queryset = self.before(queryset, self.decode_position(encoded, queryset.model))
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_position(page[-1])
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+class ProjectFeedPagination(pagination.CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-pk'
+
+def get_project_preview_url(request, project):
+    preview_url = request.build_absolute_uri(reverse('staticdata:project_preview', args=[project.id]))
+    if project.content_hash:
+        preview_url += f"?v={project.content_hash}"
+    return preview_url
+
 @api_view(['GET'])
 def list_projects(request):
+    """
+    Explore feed. `mode=summary` returns card metadata with a `preview_url` instead of
+    the inlined combined.html. Summary mode is always cursor paginated; full mode is
+    paginated only when `cursor` or `page_size` is passed, so old clients keep working.
+    """
     projects_data = []
     auth_username = get_username_from_auth_header(request)
+    mode = request.GET.get('mode', 'full')
+    if mode not in ('full', 'summary'):
+        return JsonResponse({"error": "Invalid mode. Choose from: full, summary."}, status=400)
 
     if auth_username:
-        projects_queryset = Project.objects.filter(username=auth_username).order_by('-pk')
+        projects_queryset = Project.objects.filter(username=get_visora_user(request))
     else:
         selected_tab = request.GET.get('selectedTab')
         grade = request.GET.get('grade')
@@ -149,53 +269,63 @@ def list_projects(request):
         if selected_tab: filter_q &= Q(tabname=selected_tab)
         if grade: filter_q &= Q(gradename=grade)
         if subject: filter_q &= Q(subjectname=subject)
-        projects_queryset = Project.objects.filter(filter_q).order_by('-pk')
+        projects_queryset = Project.objects.filter(filter_q, username__isnull=False)
+    projects_queryset = projects_queryset.select_related('username').order_by('-pk')
 
-    for project in projects_queryset:
-        user = UserNameDb.objects.filter(username=project.username).first()
-        if not user:
-            logger.warning(f"Project {project.id} has username '{project.username}' not in UserNameDb.")
-            continue
+    paginator = None
+    if mode == 'summary' or 'cursor' in request.GET or 'page_size' in request.GET:
+        paginator = ProjectFeedPagination()
+        projects_queryset = paginator.paginate_queryset(projects_queryset, request)
 
-        relative_combined_path = os.path.join("projects", project.get_folder_name(), "combined.html")
-        full_combined_path = os.path.join(settings.MEDIA_ROOT, relative_combined_path)
-        combined_html_content = ""
+    feed_projects = list(projects_queryset)
 
-        if os.path.exists(full_combined_path):
-            try:
-                with open(full_combined_path, "r", encoding="utf-8", errors='ignore') as f:
-                    combined_html_content = f.read()
-            except Exception as e:
-                logger.error(f"Error reading combined.html for project {project.id}: {e}")
-        else:
-            logger.warning(f"Combined.html not found for project {project.id} at {full_combined_path}")
+    # Everything in the payload is derived from these rows and the blobs they point at,
+    # so the ETag can be checked before any combined.html is read.
+    etag = make_etag(mode, request.get_full_path(), *(
+        (project.pk, project.updated_at.isoformat(), project.content_hash,
+         project.username.username, project.username.profile_picture, project.username.userid)
+        for project in feed_projects
+    ))
+    not_modified = conditional_response(request, etag, private=bool(auth_username))
+    if not_modified:
+        return not_modified
 
-        projects_data.append({
+    for project in feed_projects:
+        user = project.username
+        project_data = {
             "id": project.id, "name": project.name, "description": project.description,
             "username": user.username, "profile_picture": user.profile_picture,
             "user_userid": user.userid, "token": project.token,
-            "updated_at": project.pk, # Consider adding a real updated_at field to Project model
-            "combined_html": combined_html_content,
-        })
-    return JsonResponse({"projects": projects_data})
+            "updated_at": project.updated_at,
+        }
+        if mode == 'summary':
+            project_data.update({
+                "tabname": project.tabname, "gradename": project.gradename, "subjectname": project.subjectname,
+                "total_likes": project.like_count, "total_comments": project.comment_count,
+                "preview_url": get_project_preview_url(request, project),
+            })
+        else:
+            project_data["combined_html"] = read_combined_html(project)
+        projects_data.append(project_data)
+
+    response_data = {"projects": projects_data}
+    if paginator:
+        response_data["next"] = paginator.get_next_link()
+        response_data["previous"] = paginator.get_previous_link()
+    return add_validators(JsonResponse(response_data), etag, private=bool(auth_username))
 
 @api_view(['GET'])
 def get_project(request, id):
     try:
         project = Project.objects.get(id=id)
-        relative_combined_path = os.path.join("projects", project.get_folder_name(), "combined.html")
-        full_combined_path = os.path.join(settings.MEDIA_ROOT, relative_combined_path)
-        combined_html_content = ""
-        if os.path.exists(full_combined_path):
-            try:
-                with open(full_combined_path, "r", encoding="utf-8", errors='ignore') as f:
-                    combined_html_content = f.read()
-            except Exception as e:
-                logger.error(f"Error reading combined.html for project detail {project.id}: {e}")
+        etag = project_etag(project)
+        not_modified = conditional_response(request, etag, project.updated_at)
+        if not_modified:
+            return not_modified
         serializer = ProjectSerializer(project)
         data = serializer.data
-        data['combined_html'] = combined_html_content
-        return Response(data)
+        data['combined_html'] = read_combined_html(project)
+        return add_validators(Response(data), etag, project.updated_at)
     except Project.DoesNotExist:
         return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
     except ValueError:
@@ -207,13 +337,13 @@ def update_project_code(request, id):
     if not username:
         return Response({"error": "Unauthorized or User not found"}, status=status.HTTP_401_UNAUTHORIZED)
     try:
-        project = Project.objects.get(id=id)
+        project = Project.objects.select_related('username').get(id=id)
     except Project.DoesNotExist:
         return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
     except ValueError:
         return Response({"error": "Invalid project ID format"}, status=status.HTTP_400_BAD_REQUEST)
 
-    if project.username != username:
+    if not project.username or project.username.username != username:
         return Response({"error": "Permission denied. You do not own this project."}, status=status.HTTP_403_FORBIDDEN)
 
     data = request.data
@@ -222,22 +352,11 @@ def update_project_code(request, id):
     html_content = data.get("html_content", "")
     css_content = data.get("css_content", "")
     js_content = data.get("js_content", "")
-    
-    combined_html = f"""<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0"><title>{project.name}</title><style>{css_content}</style></head><body>{html_content}<script type="module">{js_content}</script></body></html>"""
-    project_folder_path = os.path.join(settings.MEDIA_ROOT, "projects", project.get_folder_name())
-    os.makedirs(project_folder_path, exist_ok=True)
-    combined_file_name = "combined.html"
-    combined_file_server_path = os.path.join(project_folder_path, combined_file_name)
 
     try:
-        with open(combined_file_server_path, "w", encoding="utf-8") as f:
-            f.write(combined_html)
-        project.save()
-        relative_path_for_db = os.path.join("projects", project.get_folder_name(), combined_file_name)
-        ProjectFile.objects.update_or_create(
-            project=project, file__endswith=combined_file_name,
-            defaults={'file': relative_path_for_db}
-        )
+        project.save(update_fields=["name", "description", "updated_at"])
+        # Like the upload views: supersedes the project's pending upload jobs under its row lock.
+        publish_project_upload(project, html_content, css_content, js_content)
     except IOError as e:
         logger.error(f"IOError writing combined.html for project {project.id}: {e}")
         return Response({"error": "Failed to write project file to server."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -247,7 +366,7 @@ def update_project_code(request, id):
 
     serializer = ProjectSerializer(project)
     response_data = serializer.data
-    response_data['combined_html'] = combined_html
+    response_data['combined_html'] = read_combined_html(project)
     return Response(response_data, status=status.HTTP_200_OK)
 
 @api_view(['DELETE'])
@@ -256,21 +375,21 @@ def delete_project_server(request, id):
     if not username:
         return Response({"error": "Unauthorized or User not found"}, status=status.HTTP_401_UNAUTHORIZED)
     try:
-        project = Project.objects.get(id=id)
+        project = Project.objects.select_related('username').get(id=id)
     except Project.DoesNotExist:
         return Response({"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND)
     except ValueError:
         return Response({"error": "Invalid project ID format"}, status=status.HTTP_400_BAD_REQUEST)
 
-    if project.username != username:
+    if not project.username or project.username.username != username:
         return Response({"error": "Permission denied. You do not own this project."}, status=status.HTTP_403_FORBIDDEN)
 
     try:
-        project_folder_path = os.path.join(settings.MEDIA_ROOT, "projects", project.get_folder_name())
-        if os.path.exists(project_folder_path):
-            shutil.rmtree(project_folder_path)
-            logger.info(f"Deleted project folder: {project_folder_path}")
-        project.delete()
+        delete_legacy_project_folder(project)
+        with transaction.atomic():
+            like_count, comment_count = Project.objects.values_list('like_count', 'comment_count').get(pk=project.pk)
+            project.delete()
+            apply_score_delta(project.username, -project_score(like_count, comment_count))
         logger.info(f"Deleted project {id} for user {username} from database.")
         return Response(status=status.HTTP_204_NO_CONTENT)
     except Exception as e:
@@ -282,46 +401,147 @@ def list_project_names_ids(request):
     auth_username = get_username_from_auth_header(request)
     if not auth_username:
          return JsonResponse({"error": "Authorization header required or user not found"}, status=401)
-    projects = Project.objects.filter(username=auth_username)
+    projects = Project.objects.filter(username=get_visora_user(request)).only('id', 'name')
     for project in projects:
         projects_data.append({"id": project.id, "name": project.name})
     return JsonResponse({"projects": projects_data})
 
+MAX_SOCIAL_STATE_IDS = 100
+
+@api_view(['GET'])
+def projects_social_state(request):
+    """
+    Like count, comment count and the caller's is_liked flag for up to 100 projects, from
+    ?ids=<uuid>,<uuid>,... (or repeated ids=). Two queries however many ids are asked for;
+    unknown ids are listed under "missing".
+    """
+    raw_ids = [part for value in request.query_params.getlist('ids') for part in value.split(',') if part.strip()]
+    if not raw_ids:
+        return Response({"error": "Provide project ids with ?ids=<uuid>,<uuid>"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(raw_ids) > MAX_SOCIAL_STATE_IDS:
+        return Response({"error": f"At most {MAX_SOCIAL_STATE_IDS} ids per request."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        project_ids = list(dict.fromkeys(uuid.UUID(raw_id.strip()) for raw_id in raw_ids))
+    except ValueError:
+        return Response({"error": "Invalid project ID format"}, status=status.HTTP_400_BAD_REQUEST)
+
+    counts = Project.objects.filter(pk__in=project_ids).values_list('pk', 'like_count', 'comment_count')
+    auth_username = request.headers.get("Authorization")
+    liked_ids = set()
+    if auth_username:
+        # Joined on the username, so no separate UserNameDb lookup is needed.
+        liked_ids = set(
+            ProjectLike.objects.filter(project__in=project_ids, username__username=auth_username)
+            .values_list('project_id', flat=True)
+        )
+
+    projects = {
+        str(project_id): {"total_likes": like_count, "total_comments": comment_count, "is_liked": project_id in liked_ids}
+        for project_id, like_count, comment_count in counts
+    }
+    missing = [str(project_id) for project_id in project_ids if str(project_id) not in projects]
+    response = Response({"projects": projects, "missing": missing})
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+class CommentKeysetPagination(KeysetPagination):
+    key_field = 'created_at'
+    page_size = 20
+
 class CommentCreateView(APIView):
     serializer_class = ProjectCommentSerializer
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, project_id):
-        project = get_object_or_404(Project, id=project_id)
-        comments = ProjectComment.objects.filter(project=project).order_by("-created_at")
-        serializer = self.serializer_class(comments, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        """
+        Without parameters, the whole thread newest first (legacy). With `cursor` (may be empty)
+        or `page_size`, keyset pages newest first; the first page also returns a `since` cursor.
+        With `since=<cursor>`, only comments newer than it, oldest first, plus `next_since` to
+        poll with next.
+        """
+        if not Project.objects.filter(id=project_id).exists():
+            raise NotFound("No Project matches the given query.")
+        comments = ProjectComment.objects.filter(project_id=project_id).select_related('username')
+        params = request.query_params
+        if 'since' in params:
+            return self.list_since(request, comments, params['since'])
+        if 'cursor' not in params and 'page_size' not in params:
+            comments = comments.order_by("-created_at", "-id")
+            serializer = self.serializer_class(comments, many=True, context={'request': request})
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        paginator = CommentKeysetPagination()
+        page = paginator.paginate_queryset(comments, request, view=self)
+        serializer = self.serializer_class(page, many=True, context={'request': request})
+        response = paginator.get_paginated_response(serializer.data)
+        if not params.get('cursor'):
+            response.data['since'] = paginator.encode_position(page[0]) if page else ''
+        return response
+
+    def list_since(self, request, comments, since):
+        paginator = CommentKeysetPagination()
+        page_size = paginator.get_page_size(request)
+        comments = comments.order_by("created_at", "id")
+        if since:
+            comments = paginator.after(comments, paginator.decode_position(since, ProjectComment))
+        page = list(comments[:page_size + 1])
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        serializer = self.serializer_class(page, many=True, context={'request': request})
+        return Response({
+            "results": serializer.data,
+            "next_since": paginator.encode_position(page[-1]) if page else since,
+            "has_more": has_more,
+        })
 
     def post(self, request, project_id):
         username_str = get_username_from_auth_header(request)
         if not username_str:
             return JsonResponse({"error": "Unauthorized or User not found"}, status=401)
-        user = UserNameDb.objects.filter(username=username_str).first()
-        if not user:
-            return JsonResponse({"error": "User not found in UserNameDb"}, status=404)
-        project = get_object_or_404(Project, id=project_id)
+        user = get_visora_user(request)
+        project = get_object_or_404(Project.objects.select_related('username'), id=project_id)
         serializer = self.serializer_class(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save(username=user, project=project)
-            try: likeScoreCalculation(project.username)
-            except Exception as e: logger.error(f"Error in likeScoreCalculation for {project.username} during comment: {e}")
+            with transaction.atomic():
+                serializer.save(username=user, project=project)
+                Project.objects.filter(pk=project.pk).update(comment_count=F('comment_count') + 1, updated_at=now())
+                apply_score_delta(project.username, COMMENT_POINTS)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def set_project_like(project, user, liked):
+    """
+    Makes `user` like (liked=True) or unlike `project`; a no-op when it already is in that
+    state. Returns (changed, total_likes), with the count read back from the counter column
+    inside the same transaction. unique_project_like_user makes concurrent calls safe: a
+    racing insert is absorbed by get_or_create instead of duplicating the like.
+    With LIKE_WRITE_BEHIND on, the counter and score are left to flush_like_deltas.
+    """
+    with transaction.atomic():
+        if liked:
+            _, changed = ProjectLike.objects.get_or_create(username=user, project=project)
+        else:
+            deleted, _ = ProjectLike.objects.filter(username=user, project=project).delete()
+            changed = deleted > 0
+        if settings.LIKE_WRITE_BEHIND:
+            if changed:
+                buffer_like_delta(project, 1 if liked else -1)
+            return changed, buffered_like_count(project)
+        if changed:
+            Project.objects.filter(pk=project.pk).update(like_count=F('like_count') + (1 if liked else -1), updated_at=now())
+            apply_score_delta(project.username, LIKE_POINTS if liked else -LIKE_POINTS)
+        total_likes = Project.objects.values_list('like_count', flat=True).get(pk=project.pk)
+    return changed, total_likes
+
 @method_decorator(csrf_exempt, name='dispatch')
 class LikeToggleView(View):
     def get(self, request, project_id):
         username_str = get_username_from_auth_header(request)
         if not username_str:
             return JsonResponse({"error": "Unauthorized or User not found"}, status=401)
-        user = get_object_or_404(UserNameDb, username=username_str)
+        user = get_visora_user(request)
         project = get_object_or_404(Project, id=project_id)
-        total_likes = project.total_likes()
+        total_likes = project.like_count
         is_liked = ProjectLike.objects.filter(username=user, project=project).exists()
         return JsonResponse({"total_likes": total_likes, "is_liked": is_liked})
 
@@ -329,19 +549,39 @@ class LikeToggleView(View):
         username_str = get_username_from_auth_header(request)
         if not username_str:
             return JsonResponse({"error": "Unauthorized or User not found"}, status=401)
-        user = get_object_or_404(UserNameDb, username=username_str)
-        project = get_object_or_404(Project, id=project_id)
-        like, created = ProjectLike.objects.get_or_create(username=user, project=project)
-        if not created:
-            like.delete()
-            liked = False
-        else:
-            liked = True
-        total_likes = project.total_likes()
-        try: likeScoreCalculation(project.username)
-        except Exception as e: logger.error(f"Error in likeScoreCalculation for {project.username} during like toggle: {e}")
+        user = get_visora_user(request)
+        project = get_object_or_404(Project.objects.select_related('username'), id=project_id)
+        liked = not ProjectLike.objects.filter(username=user, project=project).exists()
+        _, total_likes = set_project_like(project, user, liked)
         return JsonResponse({"liked": liked, "likes_count": total_likes})
 
+@method_decorator(csrf_exempt, name='dispatch')
+class ProjectLikeStateView(View):
+    """
+    Idempotent likes: PUT {"liked": true|false} sets the caller's like to that state and
+    DELETE unlikes, so retries and double-taps cannot flip it the wrong way.
+    """
+    def put(self, request, project_id):
+        try:
+            liked = json.loads(request.body.decode("utf-8")).get("liked")
+        except (json.JSONDecodeError, AttributeError):
+            return JsonResponse({"error": "Invalid JSON data"}, status=400)
+        if not isinstance(liked, bool):
+            return JsonResponse({"error": "'liked' must be true or false"}, status=400)
+        return self.set_state(request, project_id, liked)
+
+    def delete(self, request, project_id):
+        return self.set_state(request, project_id, False)
+
+    def set_state(self, request, project_id, liked):
+        username_str = get_username_from_auth_header(request)
+        if not username_str:
+            return JsonResponse({"error": "Unauthorized or User not found"}, status=401)
+        user = get_visora_user(request)
+        project = get_object_or_404(Project.objects.select_related('username'), id=project_id)
+        changed, total_likes = set_project_like(project, user, liked)
+        return JsonResponse({"liked": liked, "changed": changed, "likes_count": total_likes})
+
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterUserNameDbView(View):
     def post(self, request):
@@ -356,6 +596,7 @@ class RegisterUserNameDbView(View):
                 return JsonResponse({"error": "User already exists in Visiora-Data."}, status=400)
             user = UserNameDb.objects.create(username=username, email=email,profile_picture=profile_picture,userid=userid,role=role)
             Leaderboard.objects.get_or_create(user=user) # Use the created user instance
+            invalidate_visora_user(username)
             return JsonResponse({"message": "User created in Visiora-Data."}, status=201)
         except json.JSONDecodeError:
             return JsonResponse({"error": "Invalid JSON format"}, status=400)
@@ -392,12 +633,83 @@ class ScorePagination(pagination.PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+class ScoreKeysetPagination(KeysetPagination):
+    """Ranking order (-score, -id) on leaderboard_score_id_idx; used when the request has a `cursor`."""
+    key_field = 'score'
+
+def leaderboard_rank(entry):
+    """
+    1-based position of entry in (-score, -id) order: one COUNT over the part of
+    leaderboard_score_id_idx ahead of entry. That is an index-only scan, but it reads one
+    index entry per player ranked above, so it costs O(rank), not O(log n). For players far
+    down a large board, the all-time LeaderboardSnapshot keeps a rank per user that is an
+    O(log n) lookup, as of its last rebuild.
+    """
+    return Leaderboard.objects.filter(Q(score__gt=entry.score) | Q(score=entry.score, id__gt=entry.id)).count() + 1
+
 class ScoreViewSet(viewsets.ModelViewSet):
-    queryset = Leaderboard.objects.all().order_by('-score')
+    queryset = Leaderboard.objects.select_related('user').order_by('-score', '-id')
     serializer_class = ScoreSerializer
     pagination_class = ScorePagination
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['score', 'updated_at']
+    max_around = 50
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if ScoreKeysetPagination.cursor_query_param in self.request.query_params:
+                self._paginator = ScoreKeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_requested_entry(self, request):
+        """Leaderboard entry of ?username=, or of the Authorization header user."""
+        username = request.query_params.get('username') or request.headers.get('Authorization')
+        if not username:
+            raise NotFound('Provide a username or an Authorization header.')
+        entry = Leaderboard.objects.select_related('user').filter(user__username=username).order_by('pk').first()
+        if entry is None:
+            raise NotFound(f"No leaderboard entry for '{username}'.")
+        return entry
+
+    @action(detail=False, methods=['get'])
+    def rank(self, request):
+        entry = self.get_requested_entry(request)
+        data = self.get_serializer(entry).data
+        data['rank'] = leaderboard_rank(entry)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def around(self, request):
+        """The user's entry with up to k (default 5) neighbours on each side, each with its rank."""
+        try:
+            k = min(max(int(request.query_params.get('k', 5)), 0), self.max_around)
+        except ValueError:
+            return Response({'error': 'k must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        entry = self.get_requested_entry(request)
+        rank = leaderboard_rank(entry)
+        base = Leaderboard.objects.select_related('user')
+        above = list(base.filter(Q(score__gt=entry.score) | Q(score=entry.score, id__gt=entry.id)).order_by('score', 'id')[:k])
+        below = list(base.filter(Q(score__lt=entry.score) | Q(score=entry.score, id__lt=entry.id)).order_by('-score', '-id')[:k])
+        window = above[::-1] + [entry] + below
+        results = self.get_serializer(window, many=True).data
+        first_rank = rank - len(above)
+        for offset, item in enumerate(results):
+            item['rank'] = first_rank + offset
+        return Response({'rank': rank, 'results': results})
+
+class LeaderboardSnapshotView(generics.ListAPIView):
+    """Read-only daily/weekly/all-time rankings, precomputed by rebuild_leaderboard_windows."""
+    serializer_class = LeaderboardSnapshotSerializer
+    pagination_class = ScorePagination
+
+    def get_queryset(self):
+        window = self.kwargs['window']
+        if window not in dict(LeaderboardSnapshot.WINDOW_CHOICES):
+            raise NotFound(f"Unknown window '{window}'. Valid windows are: {', '.join(dict(LeaderboardSnapshot.WINDOW_CHOICES))}")
+        return LeaderboardSnapshot.objects.filter(window=window).select_related('user').order_by('rank')
 
 @api_view(['POST'])
 def generate_ai_content(request, project_id, content_type):
@@ -413,19 +725,22 @@ def generate_ai_content(request, project_id, content_type):
 
 class CategoryListView(APIView):
     def get(self, request):
-        root_categories = Category.objects.filter(parent__isnull=True)
+        # One query for the whole tree, assembled in memory.
+        children_by_parent = {}
+        for category in Category.objects.only('id', 'name', 'parent_id', 'category_name').order_by('id'):
+            children_by_parent.setdefault(category.parent_id, []).append(category)
         structured_data = {}
-        for category in root_categories:
-            structured_data[category.name] = self.build_category_structure(category)
+        for category in children_by_parent.get(None, []):
+            structured_data[category.name] = self.build_category_structure(category, children_by_parent)
         return Response(structured_data)
-    
-    def build_category_structure(self, category):
-        children = category.children.all()
+
+    def build_category_structure(self, category, children_by_parent):
+        children = children_by_parent.get(category.id)
         if not children:
-            return category.category_name if category.category_name else [] 
+            return category.category_name if category.category_name else []
         data = {}
         for child in children:
-            data[child.name] = self.build_category_structure(child)
+            data[child.name] = self.build_category_structure(child, children_by_parent)
         return data
 
 class StandardResultsSetPagination(pagination.PageNumberPagination):
@@ -442,7 +757,7 @@ class ProjectSearchView(generics.ListAPIView):
         if query:
             return Project.objects.filter(
                 Q(name__icontains=query) | Q(description__icontains=query)
-            ).order_by('-pk')
+            ).prefetch_related('files').order_by('-pk')
         return Project.objects.none()
 
 class ProjectDetailView(generics.RetrieveAPIView):
@@ -452,19 +767,139 @@ class ProjectDetailView(generics.RetrieveAPIView):
     lookup_field = 'id'
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
+        etag = project_etag(instance)
+        not_modified = conditional_response(request, etag, instance.updated_at)
+        if not_modified:
+            return not_modified
         serializer = self.get_serializer(instance)
         data = serializer.data
-        relative_combined_path = os.path.join("projects", instance.get_folder_name(), "combined.html")
-        full_combined_path = os.path.join(settings.MEDIA_ROOT, relative_combined_path)
-        combined_html_content = ""
-        if os.path.exists(full_combined_path):
+        data['combined_html'] = read_combined_html(instance)
+        return add_validators(Response(data), etag, instance.updated_at)
+
+def parse_byte_range(range_header, size):
+    """
+    Parses a single `bytes=start-end` range. Returns (start, end) inclusive, None to
+    serve the whole file (absent, malformed or multi-range headers) or False when
+    the range cannot be satisfied.
+    """
+    if not range_header or not range_header.startswith('bytes=') or ',' in range_header:
+        return None
+    start_str, _, end_str = range_header[len('bytes='):].strip().partition('-')
+    try:
+        if not start_str:
+            suffix_length = int(end_str)
+            if suffix_length <= 0:
+                return False
+            return max(size - suffix_length, 0), size - 1
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+def choose_content_encoding(accept_encoding):
+    """Picks 'br' or 'gzip' from an Accept-Encoding header (in that order of preference), or None."""
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
             try:
-                with open(full_combined_path, "r", encoding="utf-8", errors='ignore') as f:
-                    combined_html_content = f.read()
-            except Exception as e:
-                logger.error(f"Error reading combined.html for project detail {instance.id} (generic view): {e}")
-        data['combined_html'] = combined_html_content
-        return Response(data)
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for encoding in ('br', 'gzip'):
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+def sandboxed_preview(view):
+    """Adds the PROJECT_PREVIEW_CSP sandbox and nosniff to every response of a preview view, 304s included."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        response['Content-Security-Policy'] = settings.PROJECT_PREVIEW_CSP
+        response['X-Content-Type-Options'] = 'nosniff'
+        return response
+    return wrapper
+
+@require_safe
+@sandboxed_preview
+@xframe_options_exempt
+def project_preview(request, id):
+    """
+    Serves the minified variant of the project's combined.html for iframes, using its
+    precompressed .br/.gz variant when the client accepts it. With PROJECT_PREVIEW_SENDFILE set, the bytes are
+    handed to the front proxy via X-Accel-Redirect / X-Sendfile instead. The uploaded
+    HTML runs sandboxed (see sandboxed_preview), away from this origin's cookies.
+    """
+    project = get_object_or_404(Project.objects.only('id', 'name', 'token', 'content_hash', 'updated_at'), id=id)
+    relative_path = get_served_relative_path(project)
+    full_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    content_encoding = None
+    # nginx drops Content-Encoding on internal redirects; its gzip_static/brotli_static do this there.
+    if project.content_hash and settings.PROJECT_PREVIEW_SENDFILE != 'x-accel-redirect':
+        content_encoding = choose_content_encoding(request.headers.get('Accept-Encoding'))
+        variant_path = get_compressed_variant_path(full_path, content_encoding) if content_encoding else None
+        if variant_path:
+            full_path = variant_path
+        else:
+            content_encoding = None
+    try:
+        file_stat = os.stat(full_path)
+    except FileNotFoundError:
+        logger.warning(f"Combined.html not found for project preview {project.id} at {full_path}")
+        return JsonResponse({"error": "Project preview not found"}, status=404)
+
+    last_modified = datetime.fromtimestamp(file_stat.st_mtime, tz=dt_timezone.utc)
+    if content_encoding:
+        etag = f'"{project.content_hash}-{content_encoding}"'
+    elif project.content_hash:
+        etag = f'"{project.content_hash}"'
+    else:
+        etag = make_etag(relative_path, file_stat.st_size, file_stat.st_mtime_ns)
+    # preview_url carries ?v=<content_hash>; while it matches, the URL always returns these bytes.
+    immutable = bool(project.content_hash) and request.GET.get('v') == project.content_hash
+    not_modified = conditional_response(request, etag, last_modified, immutable=immutable)
+    if not_modified:
+        if project.content_hash:
+            patch_vary_headers(not_modified, ['Accept-Encoding'])
+        return not_modified
+
+    content_type = 'text/html; charset=utf-8'
+    sendfile_mode = settings.PROJECT_PREVIEW_SENDFILE
+    if sendfile_mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.PROJECT_PREVIEW_ACCEL_PREFIX + relative_path.replace(os.sep, '/')
+    elif sendfile_mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        byte_range = None
+        if request.headers.get('If-Range', etag) == etag:
+            byte_range = parse_byte_range(request.headers.get('Range'), file_stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{file_stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            with open(full_path, 'rb') as f:
+                f.seek(start)
+                response = HttpResponse(f.read(end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{file_stat.st_size}'
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+    if project.content_hash:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return add_validators(response, etag, last_modified, immutable=immutable)
 
 class ProjectMaterialsView(generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
@@ -664,23 +1099,25 @@ class OpenSourceUploadProjectAPIView(APIView):
         if not name or not username_from_payload:
             return Response({"error": "Project name and username are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not UserNameDb.objects.filter(username=username_from_payload).exists():
+        user_obj = UserNameDb.objects.filter(username=username_from_payload).first()
+        if not user_obj:
             return Response({"error": f"Username '{username_from_payload}' provided does not exist."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        user_obj = UserNameDb.objects.get(username=username_from_payload)
         if not email: email = user_obj.email
 
-        project, created = Project.objects.get_or_create(
-            name=name, username=username_from_payload,
-            defaults={
-                'description': description, 'token': token, 'email': email,
-                'tabname': tabname, 'gradename': gradename, 'subjectname': subjectname
-            }
-        )
+        with transaction.atomic():
+            project, created = Project.objects.get_or_create(
+                name=name, username=user_obj,
+                defaults={
+                    'description': description, 'token': token, 'email': email,
+                    'tabname': tabname, 'gradename': gradename, 'subjectname': subjectname
+                }
+            )
+            if created:
+                apply_score_delta(user_obj, PROJECT_POINTS)
         if not created:
             project.description = description; project.token = token; project.email = email
             project.tabname = tabname; project.gradename = gradename; project.subjectname = subjectname
-            project.save()
+            project.save(update_fields=UPLOAD_METADATA_FIELDS)
 
         if files:
             for file_obj in files:
@@ -689,22 +1126,46 @@ class OpenSourceUploadProjectAPIView(APIView):
                 elif ext == ".css": css_content = file_obj.read().decode("utf-8", errors='ignore')
                 elif ext == ".js": js_content = file_obj.read().decode("utf-8", errors='ignore')
         
-        combined_html = f"""<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0"><title>{project.name}</title><style>{css_content}</style></head><body>{html_content}<script type="module">{js_content}</script></body></html>"""
-        
-        project_folder_path = os.path.join(settings.MEDIA_ROOT, "projects", project.get_folder_name())
-        os.makedirs(project_folder_path, exist_ok=True)
-        combined_file_name = "combined.html"
-        combined_file_server_path = os.path.join(project_folder_path, combined_file_name)
-        with open(combined_file_server_path, "w", encoding="utf-8") as f:
-            f.write(combined_html)
-        relative_path_for_db = os.path.join("projects", project.get_folder_name(), combined_file_name)
-        ProjectFile.objects.update_or_create(
-            project=project, file__endswith=combined_file_name,
-            defaults={'file': relative_path_for_db}
-        )
-        
-        try: likeScoreCalculation(project.username)
-        except Exception as e: logger.error(f"Error in likeScoreCalculation for {project.username} (opensource): {e}")
-        
+        if wants_async_upload(request):
+            return upload_job_accepted(request, enqueue_upload(project, html_content, css_content, js_content))
+        publish_project_upload(project, html_content, css_content, js_content)
+
         serializer = ProjectSerializer(project)
-        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+class BulkImportProjectsAPIView(APIView):
+    """
+    Creates or updates many projects at once from a zip or NDJSON file (formats are described
+    in staticdata.bulk_import), sent as the `file` multipart field or as the raw request body.
+    Requires the backend key; the import is all-or-nothing.
+    """
+    def post(self, request):
+        if not has_backend_secret(request):
+            return Response({"error": "Invalid or missing backend key."}, status=status.HTTP_403_FORBIDDEN)
+
+        if request.content_type.startswith("multipart/"):
+            stream = request.FILES.get("file")
+            if stream is None:
+                return Response({"error": "No file provided."}, status=status.HTTP_400_BAD_REQUEST)
+            if stream.size > settings.BULK_IMPORT_MAX_BYTES:
+                return Response({"error": "Import file is too large."}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        else:
+            stream = io.BytesIO(request.body)
+
+        try:
+            results = import_projects(parse_import(stream))
+        except BulkImportError as e:
+            return Response({"error": str(e), "details": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except IOError as e:
+            logger.error(f"IOError publishing artifacts during bulk import: {e}")
+            return Response({"error": "Failed to write project files to server."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        created_count = sum(1 for _, created in results if created)
+        return Response({
+            "created": created_count,
+            "updated": len(results) - created_count,
+            "projects": [
+                {"id": str(project.id), "name": project.name, "username": project.username.username, "created": created}
+                for project, created in results
+            ],
+        }, status=status.HTTP_201_CREATED if created_count else status.HTTP_200_OK)
@@ -0,0 +1,344 @@
+"""
+LLM backend used by the AI views (visoraai and visoraplanner).
+
+settings.LLM_BACKEND selects it:
+
+- "gemini" (default): google.generativeai.GenerativeModel, configured from GEMINI_API_KEY.
+- "fake": FakeGenerativeModel, a local stand-in with the same call surface
+  (generate_content, generate_content_async, stream=True) that answers with templated
+  responses matching what each prompt asks for: the course-structure JSON, review-question
+  arrays, the html/css/js JSON objects of the developer assistant, HTML snippets or plain
+  text. Latency, streaming cadence and failure rates come from the LLM_FAKE_* settings, so
+  the AI routes can be load-tested without a key and without spending quota.
+
+The AI views are async and call the model through generate_content_async() below.
+"""
+import asyncio
+import html
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from google.api_core.exceptions import ServiceUnavailable as FakeLLMError
+except ImportError:  # Raised for simulated failures; views treat any exception as an AI failure.
+    class FakeLLMError(Exception):
+        pass
+
+logger = logging.getLogger(__name__)
+
+GEMINI = "gemini"
+FAKE = "fake"
+
+JSON_TEMPLATE_RE = re.compile(r'\{\s*((?:"\w+"\s*:\s*"[^"]*"\s*,?\s*)+)\}')
+JSON_TEMPLATE_KEY_RE = re.compile(r'"(\w+)"\s*:')
+
+_offload_executor = None
+_offload_lock = threading.Lock()
+# One semaphore per event loop: asyncio primitives cannot be shared between loops.
+_in_flight = weakref.WeakKeyDictionary()
+
+
+def get_model(model_name, system_instruction=None):
+    """
+    Returns the configured model, or None when the Gemini backend cannot be set up (the
+    views then answer that AI features are unavailable).
+    """
+    backend = settings.LLM_BACKEND
+    if backend == FAKE:
+        logger.info(f"Using the fake LLM backend in place of '{model_name}'.")
+        return FakeGenerativeModel(model_name, system_instruction=system_instruction)
+    if backend != GEMINI:
+        raise ImproperlyConfigured(f"Unknown LLM_BACKEND '{backend}'; use '{GEMINI}' or '{FAKE}'.")
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        logger.error("GEMINI_API_KEY environment variable not set! AI features will be disabled.")
+        return None
+    try:
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+        logger.info(f"Gemini model '{model_name}' configured successfully.")
+        return model
+    except Exception as e:
+        logger.error(f"Failed to configure or initialize Gemini model '{model_name}': {e}", exc_info=True)
+        return None
+
+
+def _offload():
+    global _offload_executor
+    with _offload_lock:
+        if _offload_executor is None:
+            _offload_executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_IN_FLIGHT, thread_name_prefix="llm")
+    return _offload_executor
+
+
+async def generate_content_async(model, contents, **kwargs):
+    """
+    Awaitable model.generate_content(contents, **kwargs) for the async AI views, with at
+    most LLM_MAX_IN_FLIGHT calls in flight; the rest wait their turn.
+
+    With LLM_ASYNC_CLIENT (set by dataserver.asgi) it awaits the SDK's async client. That
+    client is bound to the event loop it was first used on, which is only safe under an ASGI
+    server's long-lived loop. Elsewhere, as under WSGI where each async view runs in a loop of
+    its own, the blocking call runs on a pool of LLM_MAX_IN_FLIGHT threads instead.
+    """
+    loop = asyncio.get_running_loop()
+    if not settings.LLM_ASYNC_CLIENT:
+        return await loop.run_in_executor(_offload(), partial(model.generate_content, contents, **kwargs))
+    semaphore = _in_flight.get(loop)
+    if semaphore is None:
+        semaphore = _in_flight[loop] = asyncio.Semaphore(settings.LLM_MAX_IN_FLIGHT)
+    async with semaphore:
+        return await model.generate_content_async(contents, **kwargs)
+
+
+def parse_latency(spec):
+    """
+    Parses a latency distribution in milliseconds: "fixed:<ms>", "uniform:<min>,<max>" or
+    "lognormal:<median>,<sigma>" (long-tailed, like real model latency). Returns a function
+    that draws one value in seconds from a random.Random.
+    """
+    kind, _, arguments = spec.partition(":")
+    try:
+        values = [float(value) for value in arguments.split(",") if value.strip()]
+    except ValueError:
+        values = []
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal" and len(values) == 2 and values[0] > 0:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ImproperlyConfigured(
+        f"Invalid LLM_FAKE_LATENCY '{spec}'; use fixed:<ms>, uniform:<min>,<max> or lognormal:<median>,<sigma>."
+    )
+
+
+class FakeResponse:
+    """The parts of GenerateContentResponse the views read: text, parts, candidates, prompt_feedback."""
+
+    def __init__(self, text, blocked=False):
+        self.parts = [] if blocked else [SimpleNamespace(text=text)]
+        self.candidates = [] if blocked else [SimpleNamespace(content=SimpleNamespace(parts=self.parts), finish_reason="STOP")]
+        self.prompt_feedback = SimpleNamespace(block_reason="SAFETY" if blocked else None)
+
+    @property
+    def text(self):
+        if not self.parts:
+            raise ValueError("The response was blocked (simulated); it has no text.")
+        return "".join(part.text for part in self.parts)
+
+
+class FakeStreamResponse:
+    """Iterates over FakeResponse chunks; text holds the whole answer once iteration is done."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._received = []
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            self._received.extend(part.text for part in chunk.parts)
+            yield chunk
+
+    @property
+    def text(self):
+        return "".join(self._received)
+
+
+class FakeAsyncStreamResponse(FakeStreamResponse):
+    async def __aiter__(self):
+        async for chunk in self._chunks:
+            self._received.extend(part.text for part in chunk.parts)
+            yield chunk
+
+
+class FakeGenerativeModel:
+    _seed_lock = threading.Lock()
+    _rng = None
+
+    def __init__(self, model_name, system_instruction=None):
+        self._model_name = f"fake/{model_name}"
+        self._system_instruction = system_instruction
+
+    @classmethod
+    def rng(cls):
+        # One generator for every fake model, so LLM_FAKE_SEED makes a whole run reproducible.
+        with cls._seed_lock:
+            if cls._rng is None:
+                cls._rng = random.Random(settings.LLM_FAKE_SEED)
+            return cls._rng
+
+    def _plan(self, contents, generation_config):
+        """Decides the outcome of one call: (seconds to first chunk, [chunk texts], blocked)."""
+        rng = self.rng()
+        first_chunk_seconds = parse_latency(settings.LLM_FAKE_LATENCY)(rng)
+        outcome = rng.random()
+        if outcome < settings.LLM_FAKE_FAILURE_RATE:
+            return first_chunk_seconds, None, False
+        blocked = outcome < settings.LLM_FAKE_FAILURE_RATE + settings.LLM_FAKE_BLOCK_RATE
+        text = "" if blocked else render_response(_prompt_text(contents))
+        size = max(settings.LLM_FAKE_CHUNK_CHARS, 1)
+        chunks = [text[start:start + size] for start in range(0, len(text), size)] or [""]
+        return first_chunk_seconds, chunks, blocked
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        first_chunk_seconds, chunks, blocked = self._plan(contents, generation_config)
+        interval = settings.LLM_FAKE_CHUNK_INTERVAL_MS / 1000
+        if chunks is None:
+            time.sleep(first_chunk_seconds)
+            raise FakeLLMError("The model is overloaded. Please try again later. (simulated)")
+        if not stream:
+            time.sleep(first_chunk_seconds + interval * (len(chunks) - 1))
+            return FakeResponse("".join(chunks), blocked=blocked)
+
+        def stream_chunks():
+            time.sleep(first_chunk_seconds)
+            for index, chunk in enumerate(chunks):
+                if index:
+                    time.sleep(interval)
+                yield FakeResponse(chunk, blocked=blocked)
+
+        return FakeStreamResponse(stream_chunks())
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False, **kwargs):
+        first_chunk_seconds, chunks, blocked = self._plan(contents, generation_config)
+        interval = settings.LLM_FAKE_CHUNK_INTERVAL_MS / 1000
+        if chunks is None:
+            await asyncio.sleep(first_chunk_seconds)
+            raise FakeLLMError("The model is overloaded. Please try again later. (simulated)")
+        if not stream:
+            await asyncio.sleep(first_chunk_seconds + interval * (len(chunks) - 1))
+            return FakeResponse("".join(chunks), blocked=blocked)
+
+        async def stream_chunks():
+            await asyncio.sleep(first_chunk_seconds)
+            for index, chunk in enumerate(chunks):
+                if index:
+                    await asyncio.sleep(interval)
+                yield FakeResponse(chunk, blocked=blocked)
+
+        return FakeAsyncStreamResponse(stream_chunks())
+
+
+def _prompt_text(contents):
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_prompt_text(part) for part in contents)
+    return str(contents)
+
+
+def _search(pattern, text, default=""):
+    match = re.search(pattern, text, re.MULTILINE)
+    return match.group(1).strip() if match else default
+
+
+def render_response(prompt):
+    """The templated answer to a prompt, shaped like the output format the prompt asks for."""
+    if '"subtopics"' in prompt and '"analysis"' in prompt:
+        return json.dumps(_course_structure(prompt))
+    if "JSON array" in prompt:
+        return json.dumps(_review_questions(prompt))
+    # Prompts may quote JSON from the request; the template to follow is the one after "Output Format".
+    output_format_at = max(prompt.lower().find("output format"), 0)
+    template = JSON_TEMPLATE_RE.search(prompt, output_format_at)
+    if template:
+        keys = JSON_TEMPLATE_KEY_RE.findall(template.group(1))
+        return json.dumps({key: _json_value(key, prompt) for key in keys})
+    if "summary text" in prompt:
+        topic = _search(r'Main Topic: "(.*?)"', prompt, "this topic")
+        return (
+            f"This plan takes you from the foundations of {topic} to confident, hands-on use. "
+            f"Set aside the estimated time and work through each module in order. "
+            f"Every step builds on the last, so keep going and enjoy the progress!"
+        )
+    return _html_snippet(prompt)
+
+
+def _course_structure(prompt):
+    total_minutes = int(_search(r"\((\d+) minutes", prompt, "120"))
+    bounds = re.search(r"generate (\d+)-(\d+) detailed", prompt)
+    minimum, maximum = (int(bounds.group(1)), int(bounds.group(2))) if bounds else (5, 10)
+    topic = _search(r'Course Topic: "(.*?)"', prompt, "the topic")
+    count = max(minimum, min(maximum, total_minutes // 30 or minimum))
+    module_types = ["Introduction", "Core Concept", "Deep Dive", "Technique", "Application", "Case Study", "Project"]
+    times = [max(total_minutes // count, 20)] * count
+    times[-1] += max(total_minutes - sum(times), 0)
+    subtopics = []
+    for index in range(count):
+        progress = index / max(count - 1, 1)
+        subtopics.append({
+            "id": f"temp_id_{index + 1}",
+            "name": f"{module_types[index % len(module_types)]}: {topic} - Part {index + 1}",
+            "time": times[index],
+            "difficultyValue": round(0.2 + 0.6 * progress, 2),
+            "conceptDensity": round(0.3 + 0.5 * progress, 2),
+            "prerequisiteIds": [f"temp_id_{index}"] if index else [],
+        })
+    return {
+        "subtopics": subtopics,
+        "analysis": {
+            "difficultyCurve": [subtopic["difficultyValue"] for subtopic in subtopics],
+            "densityCurve": [subtopic["conceptDensity"] for subtopic in subtopics],
+            "estimatedTotalTime": sum(times),
+        },
+    }
+
+
+def _review_questions(prompt):
+    count = int(_search(r"exactly (\d+)", prompt, "4"))
+    names = re.findall(r"^\s*- (.+)$", prompt, re.MULTILINE) or ["the material"]
+    return [
+        f"How does {names[index % len(names)]} connect to {names[(index + 1) % len(names)]}, and why does it matter?"
+        for index in range(count)
+    ]
+
+
+def _json_value(key, prompt):
+    if key.startswith("html"):
+        return '<div class="demo"><h2>Generated demo</h2><button id="demo-button">Play</button></div>'
+    if key.startswith("css"):
+        return ".demo { padding: 16px; color: #ffffff; background: #212529; } #demo-button { background: #5823c8; }"
+    if key.startswith("js"):
+        return "document.getElementById('demo-button').addEventListener('click', () => console.log('clicked'));"
+    request = _search(r'(?:User Request|User Question|Issue Description): "?(.*?)"?$', prompt, "the request")
+    return f"Generated {key.replace('_', ' ')} for: {request[:200]}"
+
+
+def _html_snippet(prompt):
+    subject = html.escape(
+        _search(r'Current Subtopic: "(.*?)"', prompt)
+        or _search(r'Subtopic: "(.*?)"', prompt)
+        or _search(r"User Question: (.*)", prompt, "your question")
+    )
+    subtopic_id = _search(r'Subtopic ID: "(.*?)"', prompt)
+    script = ""
+    if subtopic_id:
+        script = (
+            "<script>document.getElementById('finish').addEventListener('click', () => "
+            f"window.parent.postMessage({{type: 'assessmentComplete', subtopicId: {json.dumps(subtopic_id)}, score: 1}}, '*'));</script>"
+        )
+    return (
+        "<style>.lesson { margin: 15px; background-color: #212529; color: #ffffff; font-family: sans-serif; }"
+        " .lesson button { background: #5823c8; color: #ffffff; }</style>"
+        f'<div class="lesson"><h2>{subject}</h2>'
+        f"<p>An interactive walkthrough of {subject}, with a worked example and a short check at the end.</p>"
+        '<button id="finish">Check my answer</button></div>'
+        f"{script}"
+    )
@@ -1,24 +1,23 @@
 import logging
 from django.conf import settings
 from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
-from rest_framework.decorators import api_view
-import google.generativeai as genai
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods, require_POST
 import json
-import os
 from staticdata.models import Project
+from visoraai.llm import generate_content_async, get_model
 from django.core.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import permission_classes
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini only once at startup
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-2.0-flash")
+# Configure the model only once at startup
+model = get_model("gemini-2.0-flash")
 
-@api_view(['POST'])
-def chatbot_response(request):
+@csrf_exempt
+@require_POST
+async def chatbot_response(request):
     try:
         data = json.loads(request.body.decode('utf-8'))
         user_message = data.get('message', '').strip()
@@ -34,7 +33,7 @@ def chatbot_response(request):
 
         # Fetch project
         try:
-            project = Project.objects.get(id=project_id)
+            project = await Project.objects.aget(id=project_id)
         except Project.DoesNotExist:
             return JsonResponse({"error": "Animation project not found"}, status=404)
         except ValidationError:
@@ -59,7 +58,7 @@ def chatbot_response(request):
         - if any assessment is provided by you give their ans as well as explanation too.
         """
 
-        response = model.generate_content(prompt)
+        response = await generate_content_async(model, prompt)
 
         html_content = response.text.replace("```html", "").replace("```", "").strip() # Ensure this is only body content
         style = """
@@ -89,8 +88,9 @@ def chatbot_response(request):
 
 
 
-@api_view(['POST'])
-def chatbot_response_visora_ai(request):
+@csrf_exempt
+@require_POST
+async def chatbot_response_visora_ai(request):
     try:
         data = json.loads(request.body.decode('utf-8'))
         user_message = data.get('message', '').strip()
@@ -137,7 +137,7 @@ def chatbot_response_visora_ai(request):
         - if any assessment is provided by you give their ans as well as explanation too.
         """
 
-        response = model.generate_content(prompt)
+        response = await generate_content_async(model, prompt)
 
         html_content = response.text.replace("```html", "").replace("```", "").strip() # Ensure this is only body content
         style = """
@@ -168,8 +168,9 @@ def chatbot_response_visora_ai(request):
 
 
 
-@api_view(['POST'])
-def chatbot_developer(request):
+@csrf_exempt
+@require_POST
+async def chatbot_developer(request):
     if request.method != 'POST':
         return JsonResponse({"error": "Invalid request method"}, status=405)
 
@@ -207,7 +208,7 @@ def chatbot_developer(request):
         - The 'js6569201' value should contain only the raw JavaScript code, without <script> tags.
         """
 
-        response = model.generate_content(prompt)
+        response = await generate_content_async(model, prompt)
         ai_response_text = response.text.strip()
 
         # --- Parse the AI Response ---
@@ -1,42 +1,40 @@
 import logging
 from django.conf import settings
 from django.http import JsonResponse
-from rest_framework.decorators import api_view, permission_classes
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.permissions import AllowAny # Changed from IsAuthenticated
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-import google.generativeai as genai
 import json
-import os
 from django.core.exceptions import ValidationError, ObjectDoesNotExist, ImproperlyConfigured
 from django.db import IntegrityError
 
+from .llm import generate_content_async, get_model
 from .models import UserProject
 from .serializers import UserProjectSerializer, UserProjectListSerializer
 
 
 logger = logging.getLogger(__name__)
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-model = None
+model = get_model("gemini-1.5-flash-latest")
 
-if not GEMINI_API_KEY:
-    logger.error("GEMINI_API_KEY environment variable not set! AI features will be disabled.")
-else:
+def parse_json_body(request):
+    """The JSON object in the request body ({} for an empty body), or None if it is not one."""
+    if not request.body:
+        return {}
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-1.5-flash-latest")
-        logger.info(f"Gemini AI Model '{model._model_name}' configured successfully.")
-    except Exception as e:
-        logger.error(f"Failed to configure or initialize Gemini Model: {e}", exc_info=True)
-        model = None
+        data = json.loads(request.body)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
 
-def generate_ai_response(prompt, expected_format="text"):
+async def generate_ai_response(prompt, expected_format="text"):
     if not model:
          raise Exception("AI Model not initialized or configuration failed.")
     try:
         logger.debug(f"Sending prompt to AI (first 500 chars):\n{prompt[:500]}...")
-        response = model.generate_content(prompt)
+        response = await generate_content_async(model, prompt)
 
         if not response.candidates or not response.parts:
              logger.warning(f"AI response has no candidates or parts. Response: {response}")
@@ -109,18 +107,19 @@ class UserProjectViewSet(viewsets.ModelViewSet):
             return Response( {"detail": "An server error occurred while updating the project."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR )
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def chatbot_developer_generate(request):
+@csrf_exempt
+@require_POST
+async def chatbot_developer_generate(request):
     try:
-        data = request.data
+        data = parse_json_body(request)
+        if data is None: return JsonResponse({"error": "Invalid JSON request body."}, status=status.HTTP_400_BAD_REQUEST)
         user_message = data.get('message', '').strip()
         context_data = data.get('context', {})
         is_semantic_animation_request = data.get('is_animation_request', False)
 
-        if not isinstance(context_data, dict): return Response({"error": "Invalid context format."}, status=status.HTTP_400_BAD_REQUEST)
-        if not user_message: return Response({"error": "Message cannot be empty"}, status=status.HTTP_400_BAD_REQUEST)
-        if len(user_message) > 4000: return Response({"error": "Message too long (max 4000)"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(context_data, dict): return JsonResponse({"error": "Invalid context format."}, status=status.HTTP_400_BAD_REQUEST)
+        if not user_message: return JsonResponse({"error": "Message cannot be empty"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(user_message) > 4000: return JsonResponse({"error": "Message too long (max 4000)"}, status=status.HTTP_400_BAD_REQUEST)
 
         html_context = str(context_data.get('html', ''))[:6000]
         css_context = str(context_data.get('css', ''))[:6000]
@@ -157,7 +156,7 @@ def chatbot_developer_generate(request):
             """
 
         full_prompt = base_prompt + task_prompt
-        ai_result = generate_ai_response(full_prompt, expected_format="json")
+        ai_result = await generate_ai_response(full_prompt, expected_format="json")
 
         if not isinstance(ai_result, dict):
              logger.error(f"AI response for generation was not a dict. Type: {type(ai_result)}, Value: {ai_result}")
@@ -171,10 +170,10 @@ def chatbot_developer_generate(request):
                 "explanation": str(ai_result.get("explanation", "No explanation provided.")),
                 "error": ai_result.get("error")
             }
-            return Response(response_data, status=status.HTTP_200_OK)
+            return JsonResponse(response_data, status=status.HTTP_200_OK)
         else:
              logger.error(f"AI response dict for generation missing required keys. Received: {ai_result}")
-             return Response({
+             return JsonResponse({
                  "html6569201": "", "css6569201": "", "js6569201": "",
                  "explanation": "Error: Assistant response structure was invalid.",
                  "error": "Invalid AI response structure"
@@ -183,20 +182,21 @@ def chatbot_developer_generate(request):
     except Exception as e:
         logger.error(f"Developer AI error in generate: {str(e)}", exc_info=True)
         error_message = f"Assistant error: {str(e)}" if settings.DEBUG else "Assistant is currently unavailable."
-        return Response({"error": error_message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return JsonResponse({"error": error_message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def chatbot_developer_explain(request):
+@csrf_exempt
+@require_POST
+async def chatbot_developer_explain(request):
     try:
-        data = request.data
+        data = parse_json_body(request)
+        if data is None: return JsonResponse({"error": "Invalid JSON request body."}, status=status.HTTP_400_BAD_REQUEST)
         selected_code = data.get('selected_code', '').strip()
         language = data.get('language', 'unknown').strip().lower()
         context_data = data.get('context', {})
 
-        if not selected_code: return Response({"error": "No code selected"}, status=status.HTTP_400_BAD_REQUEST)
-        if len(selected_code) > 4000: return Response({"error": "Selection too long (max 4000)"}, status=status.HTTP_400_BAD_REQUEST)
+        if not selected_code: return JsonResponse({"error": "No code selected"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(selected_code) > 4000: return JsonResponse({"error": "Selection too long (max 4000)"}, status=status.HTTP_400_BAD_REQUEST)
 
         html_context = str(context_data.get('html', ''))[:5000]
         css_context = str(context_data.get('css', ''))[:5000]
@@ -220,32 +220,33 @@ def chatbot_developer_explain(request):
         Output Format: Respond ONLY with a single JSON object string: {{ "explanation": "..." }}. NO other text before or after.
         """
 
-        ai_result = generate_ai_response(prompt, expected_format="json")
+        ai_result = await generate_ai_response(prompt, expected_format="json")
 
         if isinstance(ai_result, dict) and "explanation" in ai_result:
-            return Response({"explanation": str(ai_result["explanation"])}, status=status.HTTP_200_OK)
+            return JsonResponse({"explanation": str(ai_result["explanation"])}, status=status.HTTP_200_OK)
         else:
             logger.error(f"AI response for explanation was not valid. Type: {type(ai_result)}, Value: {ai_result}")
             fallback_explanation = "Sorry, I couldn't generate a structured explanation."
             if isinstance(ai_result, str) and ai_result:
                 fallback_explanation = ai_result
-            return Response({"explanation": fallback_explanation, "error": "Invalid AI response format"}, status=status.HTTP_200_OK)
+            return JsonResponse({"explanation": fallback_explanation, "error": "Invalid AI response format"}, status=status.HTTP_200_OK)
 
     except Exception as e:
         logger.error(f"Developer AI error in explain: {str(e)}", exc_info=True)
         error_message = f"Assistant error: {str(e)}" if settings.DEBUG else "Assistant is currently unavailable."
-        return Response({"error": error_message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return JsonResponse({"error": error_message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def chatbot_developer_optimize(request):
+@csrf_exempt
+@require_POST
+async def chatbot_developer_optimize(request):
     try:
-        data = request.data
+        data = parse_json_body(request)
+        if data is None: return JsonResponse({"error": "Invalid JSON request body."}, status=status.HTTP_400_BAD_REQUEST)
         code_to_optimize = data.get('code', {})
         user_hints = data.get('hints', '').strip()
 
         if not isinstance(code_to_optimize, dict) or not any(code_to_optimize.values()):
-             return Response({"error": "No code provided for optimization"}, status=status.HTTP_400_BAD_REQUEST)
+             return JsonResponse({"error": "No code provided for optimization"}, status=status.HTTP_400_BAD_REQUEST)
 
         html_code = str(code_to_optimize.get('html', ''))[:8000]
         css_code = str(code_to_optimize.get('css', ''))[:8000]
@@ -268,7 +269,7 @@ def chatbot_developer_optimize(request):
         - If no significant optimizations found, return original code and state that in explanation.
         """
 
-        ai_result = generate_ai_response(prompt, expected_format="json")
+        ai_result = await generate_ai_response(prompt, expected_format="json")
 
         if isinstance(ai_result, dict) and ("error" in ai_result or all(k in ai_result for k in ["html6569201", "css6569201", "js6569201", "explanation"])):
              response_data = {
@@ -278,10 +279,10 @@ def chatbot_developer_optimize(request):
                  "explanation": str(ai_result.get("explanation", "No explanation provided.")),
                  "error": ai_result.get("error")
              }
-             return Response(response_data, status=status.HTTP_200_OK)
+             return JsonResponse(response_data, status=status.HTTP_200_OK)
         else:
             logger.error(f"AI response for optimization was not valid. Received: {ai_result}")
-            return Response({
+            return JsonResponse({
                  "html6569201": html_code, "css6569201": css_code, "js6569201": js_code,
                  "explanation": "Error: Assistant did not return the expected optimization structure.",
                  "error": "Invalid AI response structure"
@@ -290,19 +291,20 @@ def chatbot_developer_optimize(request):
     except Exception as e:
         logger.error(f"Developer AI error in optimize: {str(e)}", exc_info=True)
         error_message = f"Assistant error: {str(e)}" if settings.DEBUG else "Assistant is currently unavailable."
-        return Response({"error": error_message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return JsonResponse({"error": error_message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def chatbot_developer_debug(request):
+@csrf_exempt
+@require_POST
+async def chatbot_developer_debug(request):
     try:
-        data = request.data
+        data = parse_json_body(request)
+        if data is None: return JsonResponse({"error": "Invalid JSON request body."}, status=status.HTTP_400_BAD_REQUEST)
         code_to_debug = data.get('code', {})
         user_issue = data.get('issue_description', '').strip()
         element_context = data.get('element_context', None)
 
-        if not isinstance(code_to_debug, dict) or not any(code_to_debug.values()): return Response({"error": "No code provided"}, status=status.HTTP_400_BAD_REQUEST)
-        if not user_issue: return Response({"error": "Please describe the issue"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(code_to_debug, dict) or not any(code_to_debug.values()): return JsonResponse({"error": "No code provided"}, status=status.HTTP_400_BAD_REQUEST)
+        if not user_issue: return JsonResponse({"error": "Please describe the issue"}, status=status.HTTP_400_BAD_REQUEST)
 
         html_code = str(code_to_debug.get('html', ''))[:9000]
         css_code = str(code_to_debug.get('css', ''))[:9000]
@@ -331,32 +333,33 @@ def chatbot_developer_debug(request):
         - If issue unclear or no bug found, state that and suggest general debugging strategies.
         """
 
-        ai_result = generate_ai_response(prompt, expected_format="json")
+        ai_result = await generate_ai_response(prompt, expected_format="json")
 
         if isinstance(ai_result, dict) and "debug_report" in ai_result:
-            return Response({"debug_report": str(ai_result["debug_report"])}, status=status.HTTP_200_OK)
+            return JsonResponse({"debug_report": str(ai_result["debug_report"])}, status=status.HTTP_200_OK)
         else:
             logger.error(f"AI response for debug was not valid. Received: {ai_result}")
             fallback_report = "Sorry, I couldn't generate a structured debug report."
             if isinstance(ai_result, str) and ai_result: fallback_report = ai_result
-            return Response({"debug_report": fallback_report, "error": "Invalid AI response format"}, status=status.HTTP_200_OK)
+            return JsonResponse({"debug_report": fallback_report, "error": "Invalid AI response format"}, status=status.HTTP_200_OK)
 
     except Exception as e:
         logger.error(f"Developer AI error in debug: {str(e)}", exc_info=True)
         error_message = f"Assistant error: {str(e)}" if settings.DEBUG else "Assistant is currently unavailable."
-        return Response({"error": error_message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return JsonResponse({"error": error_message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def chatbot_developer_inspect(request):
+@csrf_exempt
+@require_POST
+async def chatbot_developer_inspect(request):
     try:
-        data = request.data
+        data = parse_json_body(request)
+        if data is None: return JsonResponse({"error": "Invalid JSON request body."}, status=status.HTTP_400_BAD_REQUEST)
         element_info = data.get('element_info', {})
         full_code = data.get('full_code', {})
 
-        if not isinstance(element_info, dict) or not element_info: return Response({"error": "Element info required"}, status=status.HTTP_400_BAD_REQUEST)
-        if not isinstance(full_code, dict) or not any(full_code.values()): return Response({"error": "Code context required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(element_info, dict) or not element_info: return JsonResponse({"error": "Element info required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(full_code, dict) or not any(full_code.values()): return JsonResponse({"error": "Code context required"}, status=status.HTTP_400_BAD_REQUEST)
 
         html_code = str(full_code.get('html', ''))[:12000]
         css_code = str(full_code.get('css', ''))[:12000]
@@ -389,7 +392,7 @@ def chatbot_developer_inspect(request):
         - If identification fails, return empty strings and explain the difficulty in `explanation`.
         """
 
-        ai_result = generate_ai_response(prompt, expected_format="json")
+        ai_result = await generate_ai_response(prompt, expected_format="json")
 
         if isinstance(ai_result, dict) and ("error" in ai_result or all(k in ai_result for k in ["html_snippet", "css_rules", "js_interactions", "explanation"])):
             response_data = {
@@ -399,10 +402,10 @@ def chatbot_developer_inspect(request):
                 "explanation": str(ai_result.get("explanation", "No explanation generated.")),
                 "error": ai_result.get("error")
             }
-            return Response(response_data, status=status.HTTP_200_OK)
+            return JsonResponse(response_data, status=status.HTTP_200_OK)
         else:
             logger.error(f"AI response for inspect was not valid. Received: {ai_result}")
-            return Response({
+            return JsonResponse({
                 "html_snippet": "", "css_rules": "", "js_interactions": "",
                 "explanation": "Error: Assistant could not analyze the element structure.",
                 "error": "Invalid AI response structure"
@@ -411,7 +414,7 @@ def chatbot_developer_inspect(request):
     except Exception as e:
         logger.error(f"Developer AI error in inspect: {str(e)}", exc_info=True)
         error_message = f"Assistant error: {str(e)}" if settings.DEBUG else "Assistant is currently unavailable."
-        return Response({"error": error_message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return JsonResponse({"error": error_message}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Removed legacy chatbot views (chatbot_response, chatbot_response_visora_ai)
 # as they are not part of the core developer tool request. Keep them if needed elsewhere.
\ No newline at end of file
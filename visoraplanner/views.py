@@ -1,36 +1,23 @@
 # -*- coding: utf-8 -*-
 import logging
 import json
-import os
 import uuid
 from collections import defaultdict, deque 
 
 from django.conf import settings
 from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods 
+from django.views.decorators.http import require_http_methods, require_POST
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
 
 import google.generativeai as genai
+from visoraai.llm import generate_content_async, get_model
 logger = logging.getLogger(__name__)
 
 # --- Configuration ---
-try:
-    gemini_api_key = os.getenv("GEMINI_API_KEY")
-    if not gemini_api_key:
-        logger.error("CRITICAL: GEMINI_API_KEY environment variable not set.")
-        model = None
-    else:
-        genai.configure(api_key=gemini_api_key)
-        model = genai.GenerativeModel(
-            "gemini-2.0-flash",
-             system_instruction="You are a world-renowned expert AI specializing in instructional design and the creation of highly detailed, engaging, and pedagogically sound educational content and interactive learning materials. Adapt your explanations and assessments precisely to the specified difficulty level.",
-        )
-        logger.info("Gemini model 'gemini-2.0-flash' configured successfully.")
-except Exception as e:
-    logger.error(f"CRITICAL: Failed to configure Gemini model: {e}", exc_info=True)
-    model = None 
+model = get_model(
+    "gemini-2.0-flash",
+    system_instruction="You are a world-renowned expert AI specializing in instructional design and the creation of highly detailed, engaging, and pedagogically sound educational content and interactive learning materials. Adapt your explanations and assessments precisely to the specified difficulty level.",
+)
 
 # --- Enhanced Constants ---
 MIN_DURATION_HOURS = 0.5
@@ -504,10 +491,9 @@ def create_summary_prompt(main_topic: str, subtopic_names: list[str], total_time
 
 # --- API Views (with enhanced logging and error handling) ---
 
-@api_view(['POST'])
-@permission_classes([AllowAny]) # Change if auth needed
-@csrf_exempt # Consider CSRF protection if using session auth
-def generate_course_structure(request):
+@csrf_exempt
+@require_POST
+async def generate_course_structure(request):
     """API endpoint to generate an advanced course structure using Gemini."""
     if not model:
         return get_llm_error_response("AI Model not configured. Service unavailable.", 503)
@@ -556,7 +542,7 @@ def generate_course_structure(request):
                 response_mime_type="application/json",
                 temperature=0.65, 
             )
-            response = model.generate_content(prompt, generation_config=generation_config)
+            response = await generate_content_async(model, prompt, generation_config=generation_config)
 
             if not response.candidates:
                 feedback = response.prompt_feedback
@@ -603,10 +589,9 @@ def generate_course_structure(request):
         return JsonResponse({"error": "An unexpected server error occurred."}, status=500)
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
 @csrf_exempt
-def generate_subtopic_content(request):
+@require_POST
+async def generate_subtopic_content(request):
     """API endpoint to generate detailed HTML content for a subtopic."""
     if not model:
         return get_llm_error_response("AI Model not configured. Service unavailable.", 503)
@@ -645,7 +630,7 @@ def generate_subtopic_content(request):
             generation_config = genai.types.GenerationConfig(
                 temperature=0.7, 
             )
-            response = model.generate_content(prompt, generation_config=generation_config)
+            response = await generate_content_async(model, prompt, generation_config=generation_config)
 
             if not response.candidates:
                  feedback = response.prompt_feedback
@@ -676,10 +661,9 @@ def generate_subtopic_content(request):
         return JsonResponse({"error": "An unexpected server error occurred."}, status=500)
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
 @csrf_exempt
-def generate_subtopic_assessment(request):
+@require_POST
+async def generate_subtopic_assessment(request):
     """API endpoint to generate a comprehensive, interactive HTML assessment."""
     if not model:
         return get_llm_error_response("AI Model not configured. Service unavailable.", 503)
@@ -712,7 +696,7 @@ def generate_subtopic_assessment(request):
         try:
             # Higher temp for more varied questions/approaches
             generation_config = genai.types.GenerationConfig(temperature=0.7)
-            response = model.generate_content(prompt, generation_config=generation_config)
+            response = await generate_content_async(model, prompt, generation_config=generation_config)
 
             if not response.candidates:
                  feedback = response.prompt_feedback
@@ -735,10 +719,9 @@ def generate_subtopic_assessment(request):
         return JsonResponse({"error": "An unexpected server error occurred."}, status=500)
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
 @csrf_exempt
-def generate_review_questions(request):
+@require_POST
+async def generate_review_questions(request):
     """API endpoint to generate insightful review questions based on subtopic names."""
     if not model:
         return get_llm_error_response("AI Model not configured. Service unavailable.", 503)
@@ -772,7 +755,7 @@ def generate_review_questions(request):
                 response_mime_type="application/json",
                 temperature=0.7 # Slightly higher temp for creative questions
             )
-            response = model.generate_content(prompt, generation_config=generation_config)
+            response = await generate_content_async(model, prompt, generation_config=generation_config)
 
             if not response.candidates:
                  feedback = response.prompt_feedback
@@ -815,10 +798,9 @@ def generate_review_questions(request):
         return JsonResponse({"error": "An unexpected server error occurred."}, status=500)
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
 @csrf_exempt
-def generate_plan_summary(request):
+@require_POST
+async def generate_plan_summary(request):
     """API endpoint to generate an enhanced summary for the study plan."""
     if not model:
         return get_llm_error_response("AI Model not configured. Service unavailable.", 503)
@@ -892,7 +874,7 @@ def generate_plan_summary(request):
 
         try:
             generation_config = genai.types.GenerationConfig(temperature=0.65) # Balance info and motivation
-            response = model.generate_content(prompt, generation_config=generation_config)
+            response = await generate_content_async(model, prompt, generation_config=generation_config)
 
             if not response.candidates:
                  feedback = response.prompt_feedback